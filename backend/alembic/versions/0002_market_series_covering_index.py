@@ -0,0 +1,27 @@
+"""add covering index on market_series (metric, date) include (value)
+
+Revision ID: 0002_market_series_covering_index
+Revises: 0001_create_market_series
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002_market_series_covering_index"
+down_revision = "0001_create_market_series"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_market_series_metric_date_value",
+        "market_series",
+        ["metric", "date"],
+        postgresql_include=["value"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_market_series_metric_date_value", table_name="market_series")
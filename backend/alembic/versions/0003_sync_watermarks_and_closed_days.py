@@ -0,0 +1,88 @@
+"""add sync_watermarks and market_closed_days (KRX holiday calendar)
+
+Revision ID: 0003_sync_watermarks_and_closed_days
+Revises: 0002_market_series_covering_index
+Create Date: 2026-10-18
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0003_sync_watermarks_and_closed_days"
+down_revision = "0002_market_series_covering_index"
+branch_labels = None
+depends_on = None
+
+# Weekday market holidays. KRX-only closures (Labor Day, year-end) do not
+# apply to EXIM exchange rates. The calendar is maintained in
+# app/jobs/market_holidays.csv and applied by every sync; this initial seed
+# is kept as is for databases that already ran it.
+HOLIDAYS = [
+    (date(2025, 1, 1), "신정", ("kospi", "usdkrw")),
+    (date(2025, 1, 27), "임시공휴일", ("kospi", "usdkrw")),
+    (date(2025, 1, 28), "설날", ("kospi", "usdkrw")),
+    (date(2025, 1, 29), "설날", ("kospi", "usdkrw")),
+    (date(2025, 1, 30), "설날", ("kospi", "usdkrw")),
+    (date(2025, 3, 3), "삼일절 대체공휴일", ("kospi", "usdkrw")),
+    (date(2025, 5, 1), "근로자의 날", ("kospi",)),
+    (date(2025, 5, 5), "어린이날/부처님오신날", ("kospi", "usdkrw")),
+    (date(2025, 5, 6), "대체공휴일", ("kospi", "usdkrw")),
+    (date(2025, 6, 3), "대통령 선거", ("kospi", "usdkrw")),
+    (date(2025, 6, 6), "현충일", ("kospi", "usdkrw")),
+    (date(2025, 8, 15), "광복절", ("kospi", "usdkrw")),
+    (date(2025, 10, 3), "개천절", ("kospi", "usdkrw")),
+    (date(2025, 10, 6), "추석", ("kospi", "usdkrw")),
+    (date(2025, 10, 7), "추석", ("kospi", "usdkrw")),
+    (date(2025, 10, 8), "대체공휴일", ("kospi", "usdkrw")),
+    (date(2025, 10, 9), "한글날", ("kospi", "usdkrw")),
+    (date(2025, 12, 25), "성탄절", ("kospi", "usdkrw")),
+    (date(2025, 12, 31), "연말 휴장일", ("kospi",)),
+    (date(2026, 1, 1), "신정", ("kospi", "usdkrw")),
+    (date(2026, 2, 16), "설날", ("kospi", "usdkrw")),
+    (date(2026, 2, 17), "설날", ("kospi", "usdkrw")),
+    (date(2026, 2, 18), "설날", ("kospi", "usdkrw")),
+    (date(2026, 3, 2), "삼일절 대체공휴일", ("kospi", "usdkrw")),
+    (date(2026, 5, 1), "근로자의 날", ("kospi",)),
+    (date(2026, 5, 5), "어린이날", ("kospi", "usdkrw")),
+    (date(2026, 5, 25), "부처님오신날 대체공휴일", ("kospi", "usdkrw")),
+    (date(2026, 6, 3), "지방선거", ("kospi", "usdkrw")),
+    (date(2026, 8, 17), "광복절 대체공휴일", ("kospi", "usdkrw")),
+    (date(2026, 9, 24), "추석", ("kospi", "usdkrw")),
+    (date(2026, 9, 25), "추석", ("kospi", "usdkrw")),
+    (date(2026, 10, 5), "개천절 대체공휴일", ("kospi", "usdkrw")),
+    (date(2026, 10, 9), "한글날", ("kospi", "usdkrw")),
+    (date(2026, 12, 25), "성탄절", ("kospi", "usdkrw")),
+    (date(2026, 12, 31), "연말 휴장일", ("kospi",)),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_watermarks",
+        sa.Column("metric", sa.String(length=20), primary_key=True),
+        sa.Column("last_date", sa.Date(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    closed_days = op.create_table(
+        "market_closed_days",
+        sa.Column("metric", sa.String(length=20), primary_key=True),
+        sa.Column("date", sa.Date(), primary_key=True),
+        sa.Column("reason", sa.String(length=50), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.bulk_insert(
+        closed_days,
+        [
+            {"metric": metric, "date": holiday, "reason": f"holiday: {name}"}
+            for holiday, name, metrics in HOLIDAYS
+            for metric in metrics
+        ],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("market_closed_days")
+    op.drop_table("sync_watermarks")
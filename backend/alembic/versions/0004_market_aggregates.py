@@ -0,0 +1,54 @@
+"""add market_series_aggregates and market_period_stats
+
+Revision ID: 0004_market_aggregates
+Revises: 0003_sync_watermarks_and_closed_days
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004_market_aggregates"
+down_revision = "0003_sync_watermarks_and_closed_days"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_series_aggregates",
+        sa.Column("metric", sa.String(length=20), primary_key=True),
+        sa.Column("date", sa.Date(), primary_key=True),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("cum_sum", sa.Float(), nullable=False),
+        sa.Column("cum_sum_sq", sa.Float(), nullable=False),
+        sa.Column("ma_20", sa.Float()),
+        sa.Column("ma_60", sa.Float()),
+        sa.Column("volatility_20", sa.Float()),
+        sa.Column("drawdown", sa.Float(), nullable=False),
+    )
+    op.create_table(
+        "market_period_stats",
+        sa.Column("metric", sa.String(length=20), primary_key=True),
+        sa.Column("period", sa.String(length=10), primary_key=True),
+        sa.Column("as_of", sa.Date(), nullable=False),
+        sa.Column("start_date", sa.Date()),
+        sa.Column("end_date", sa.Date()),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.Column("min", sa.Float()),
+        sa.Column("max", sa.Float()),
+        sa.Column("avg", sa.Float()),
+        sa.Column("change", sa.Float()),
+        sa.Column("change_pct", sa.Float()),
+        sa.Column("volatility", sa.Float()),
+        sa.Column("max_drawdown", sa.Float()),
+        sa.Column("correlation", sa.Float()),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("market_period_stats")
+    op.drop_table("market_series_aggregates")
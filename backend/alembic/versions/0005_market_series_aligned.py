@@ -0,0 +1,54 @@
+"""add market_series_aligned
+
+Revision ID: 0005_market_series_aligned
+Revises: 0004_market_aggregates
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_market_series_aligned"
+down_revision = "0004_market_aggregates"
+branch_labels = None
+depends_on = None
+
+METRICS = (
+    "kospi",
+    "usdkrw",
+    "eurkrw",
+    "jpykrw",
+    "cnhkrw",
+    "gbpkrw",
+    "chfkrw",
+    "cadkrw",
+    "audkrw",
+    "nzdkrw",
+    "hkdkrw",
+    "sgdkrw",
+    "sekkrw",
+    "thbkrw",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_series_aligned",
+        sa.Column("date", sa.Date(), primary_key=True),
+        *(sa.Column(metric, sa.Float()) for metric in METRICS),
+    )
+
+    # Backfill from the narrow table; later syncs keep it up to date per changed date
+    columns = ", ".join(METRICS)
+    pivots = ", ".join(
+        f"CAST(max(value) FILTER (WHERE metric = '{metric}') AS double precision)" for metric in METRICS
+    )
+    op.execute(
+        f"INSERT INTO market_series_aligned (date, {columns}) "
+        f"SELECT date, {pivots} FROM market_series GROUP BY date"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("market_series_aligned")
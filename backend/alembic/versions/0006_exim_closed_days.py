@@ -0,0 +1,47 @@
+"""copy the USD/KRW holiday calendar to every EXIM currency
+
+Revision ID: 0006_exim_closed_days
+Revises: 0005_market_series_aligned
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006_exim_closed_days"
+down_revision = "0005_market_series_aligned"
+branch_labels = None
+depends_on = None
+
+# One EXIM request per day serves every currency, so a day is only skipped when
+# all of them have it closed; 0003 seeded the holidays for usdkrw alone.
+EXIM_METRICS = (
+    "eurkrw",
+    "jpykrw",
+    "cnhkrw",
+    "gbpkrw",
+    "chfkrw",
+    "cadkrw",
+    "audkrw",
+    "nzdkrw",
+    "hkdkrw",
+    "sgdkrw",
+    "sekkrw",
+    "thbkrw",
+)
+
+
+def upgrade() -> None:
+    metrics = ", ".join(f"('{metric}')" for metric in EXIM_METRICS)
+    op.execute(
+        "INSERT INTO market_closed_days (metric, date, reason) "
+        "SELECT m.metric, c.date, c.reason "
+        f"FROM market_closed_days c CROSS JOIN (VALUES {metrics}) AS m(metric) "
+        "WHERE c.metric = 'usdkrw' AND c.reason LIKE 'holiday:%' "
+        "ON CONFLICT DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    metrics = ", ".join(f"'{metric}'" for metric in EXIM_METRICS)
+    op.execute(f"DELETE FROM market_closed_days WHERE metric IN ({metrics}) AND reason LIKE 'holiday:%'")
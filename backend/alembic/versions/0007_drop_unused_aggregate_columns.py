@@ -0,0 +1,31 @@
+"""keep only the latest rolling row per metric in market_series_aggregates
+
+Revision ID: 0007_drop_unused_aggregate_columns
+Revises: 0006_exim_closed_days
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_drop_unused_aggregate_columns"
+down_revision = "0006_exim_closed_days"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only the latest date was ever read; the prefix sums were never used
+    op.execute("DELETE FROM market_series_aggregates WHERE date < (SELECT max(date) FROM market_series_aggregates)")
+    op.drop_column("market_series_aggregates", "cum_sum_sq")
+    op.drop_column("market_series_aggregates", "cum_sum")
+    op.drop_column("market_series_aggregates", "seq")
+
+
+def downgrade() -> None:
+    # Refilled per date by the previous refresh_aggregates on the next sync
+    op.execute("DELETE FROM market_series_aggregates")
+    op.add_column("market_series_aggregates", sa.Column("seq", sa.Integer(), nullable=False))
+    op.add_column("market_series_aggregates", sa.Column("cum_sum", sa.Float(), nullable=False))
+    op.add_column("market_series_aggregates", sa.Column("cum_sum_sq", sa.Float(), nullable=False))
@@ -0,0 +1,137 @@
+"""Precomputed aggregates of the aligned series.
+
+``refresh_aggregates`` runs at the end of every sync/seed and rebuilds:
+
+- ``market_series_aggregates``: the rolling windows on the latest aligned
+  date (20/60-day moving averages, 20-day annualized volatility of log
+  returns, drawdown from the running peak), computed over the full history.
+- ``market_period_stats``: the stats of every preset period exactly as
+  ``/api/series`` would compute them on ``as_of``, plus volatility, max
+  drawdown and the daily-return correlation between the two aligned metrics.
+
+Custom ranges are not precomputed; ``series_cache`` answers them from its
+in-memory arrays. Both tables are tiny (one row per metric / per period), so
+a full rebuild inside the sync transaction is simpler than patching them.
+"""
+
+from datetime import date
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import analytics
+from app.data_service import (
+    METRICS,
+    PERIOD_DAYS,
+    aligned_slice,
+    calculate_value_stats,
+    get_aligned_table,
+    resolve_range,
+)
+from app.models import MarketPeriodStats, MarketSeriesAggregate
+
+ROLLING_WINDOWS = (20, 60)
+VOLATILITY_WINDOW = 20
+
+
+def _round(value: float | None, digits: int = 2) -> float | None:
+    return None if value is None else round(value, digits)
+
+
+def _last(values: np.ndarray) -> float | None:
+    if not values.size or np.isnan(values[-1]):
+        return None
+    return float(values[-1])
+
+
+def _latest_rolling_row(metric: str, dates: list[date], values: np.ndarray) -> dict:
+    # The last volatility window covers the returns ending on the latest date
+    returns = analytics.log_returns(values)
+    annualize = np.sqrt(analytics.TRADING_DAYS_PER_YEAR) * 100
+    return {
+        "metric": metric,
+        "date": dates[-1],
+        "value": float(values[-1]),
+        **{f"ma_{window}": _last(analytics.rolling_mean(values, window)) for window in ROLLING_WINDOWS},
+        "volatility_20": _last(analytics.rolling_std(returns, VOLATILITY_WINDOW) * annualize),
+        "drawdown": float(analytics.drawdown(values)[-1]),
+    }
+
+
+def _period_rows(dates: list[date], columns: dict[str, np.ndarray], today: date) -> list[dict]:
+    ordinals = [series_date.toordinal() for series_date in dates]
+    rows = []
+    for period in PERIOD_DAYS:
+        query_start, query_end = resolve_range(period, today=today)
+        lo, hi = aligned_slice(ordinals, query_start, query_end)
+        window_returns = {metric: analytics.log_returns(columns[metric][lo:hi]) for metric in METRICS}
+
+        correlation = None
+        if len(METRICS) == 2:
+            correlation = analytics.correlation(*(window_returns[metric] for metric in METRICS))
+
+        for metric in METRICS:
+            window = columns[metric][lo:hi]
+            stats = calculate_value_stats(window.tolist())
+            rows.append(
+                {
+                    "metric": metric,
+                    "period": period,
+                    "as_of": today,
+                    "start_date": dates[lo] if window.size else None,
+                    "end_date": dates[hi - 1] if window.size else None,
+                    "points": int(window.size),
+                    "min": stats.get("min"),
+                    "max": stats.get("max"),
+                    "avg": stats.get("avg"),
+                    "change": stats.get("change"),
+                    "change_pct": stats.get("changePct"),
+                    "volatility": _round(analytics.annualized_volatility(window_returns[metric])),
+                    "max_drawdown": _round(analytics.max_drawdown(window)),
+                    "correlation": _round(correlation, 4),
+                }
+            )
+    return rows
+
+
+def refresh_aggregates(db: Session, today: date | None = None) -> dict:
+    """Rebuild both aggregate tables from the aligned series (caller commits)."""
+    today = today or date.today()
+
+    aligned = get_aligned_table(db)
+    dates = [row[0] for row in aligned]
+    columns = {
+        metric: analytics.as_array([float(row[i + 1]) for row in aligned]) for i, metric in enumerate(METRICS)
+    }
+
+    series_rows = [_latest_rolling_row(metric, dates, columns[metric]) for metric in METRICS] if dates else []
+    period_rows = _period_rows(dates, columns, today)
+
+    db.execute(delete(MarketSeriesAggregate))
+    db.execute(delete(MarketPeriodStats))
+    if series_rows:
+        db.execute(insert(MarketSeriesAggregate), series_rows)
+    db.execute(insert(MarketPeriodStats), period_rows)
+
+    return {"series_rows": len(series_rows), "period_rows": len(period_rows)}
+
+
+def load_period_stats(db: Session) -> list[MarketPeriodStats]:
+    return list(db.execute(select(MarketPeriodStats)).scalars().all())
+
+
+def load_latest_rolling(db: Session) -> dict[str, dict]:
+    """Rolling values on the most recent aligned date, per metric."""
+    latest_date = select(func.max(MarketSeriesAggregate.date)).scalar_subquery()
+    rows = db.execute(select(MarketSeriesAggregate).where(MarketSeriesAggregate.date == latest_date)).scalars()
+    return {
+        row.metric: {
+            "date": row.date.isoformat(),
+            "ma20": _round(row.ma_20),
+            "ma60": _round(row.ma_60),
+            "volatility20": _round(row.volatility_20),
+            "drawdown": _round(row.drawdown),
+        }
+        for row in rows
+    }
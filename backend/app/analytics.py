@@ -0,0 +1,202 @@
+"""Vectorized series analytics on contiguous NumPy arrays.
+
+Every function takes float64 arrays (one value per aligned trading day) and
+does its work in a fixed number of NumPy passes, so cost does not depend on
+per-element Python overhead. Windows that are not yet full are NaN.
+"""
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def as_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def summary(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {}
+    return {
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "std": float(values.std(ddof=1)) if values.size > 1 else 0.0,
+    }
+
+
+def simple_returns(values: np.ndarray) -> np.ndarray:
+    """``values[i] / values[i - 1] - 1``; one element shorter than ``values``."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def log_returns(values: np.ndarray) -> np.ndarray:
+    """``ln(values[i] / values[i - 1])``; one element shorter than ``values``."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(values))
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if window <= 0 or values.size < window:
+        return out
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    out[window - 1 :] = cumsum[window:] - cumsum[:-window]
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Rolling standard deviation from running sums of x and x**2."""
+    if window - ddof <= 0:
+        return np.full(values.shape, np.nan)
+    # Center first so the sum-of-squares formula keeps its precision
+    centered = values - (values.mean() if values.size else 0.0)
+    total = rolling_sum(centered, window)
+    total_sq = rolling_sum(centered * centered, window)
+    variance = (total_sq - total * total / window) / (window - ddof)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def rolling_correlation(a: np.ndarray, b: np.ndarray, window: int) -> np.ndarray:
+    """Pearson correlation of ``a`` and ``b`` over each trailing window."""
+    if a.shape != b.shape:
+        raise ValueError("rolling_correlation needs arrays of equal length")
+    a = a - (a.mean() if a.size else 0.0)
+    b = b - (b.mean() if b.size else 0.0)
+    sum_a = rolling_sum(a, window)
+    sum_b = rolling_sum(b, window)
+    cov = rolling_sum(a * b, window) - sum_a * sum_b / window
+    var_a = rolling_sum(a * a, window) - sum_a * sum_a / window
+    var_b = rolling_sum(b * b, window) - sum_b * sum_b / window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.sqrt(var_a * var_b)
+    corr[~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correlation(a: np.ndarray, b: np.ndarray) -> float | None:
+    if a.size < 2 or a.shape != b.shape or a.std() == 0 or b.std() == 0:
+        return None
+    return float(np.corrcoef(a, b)[0, 1])
+
+
+def annualized_volatility(returns: np.ndarray) -> float | None:
+    """Sample std of daily log returns, annualized, in percent."""
+    if returns.size < 2:
+        return None
+    return float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100)
+
+
+def drawdown(values: np.ndarray) -> np.ndarray:
+    """Decline from the running peak at each point, in percent (<= 0)."""
+    if values.size == 0:
+        return values.copy()
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (values / peaks - 1) * 100
+    return np.nan_to_num(out, nan=0.0)
+
+
+def max_drawdown(values: np.ndarray) -> float | None:
+    if values.size == 0:
+        return None
+    return float(drawdown(values).min())
+
+
+def to_json_list(values: np.ndarray, digits: int = 4) -> list[float | None]:
+    """Round and replace NaN with None for JSON output."""
+    rounded = np.round(values, digits)
+    out = rounded.astype(object)
+    out[np.isnan(rounded)] = None
+    return out.tolist()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previous pick and the
+    average of the next bucket, which preserves peaks and the line shape.
+    """
+    n = y.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over the interior points; spacing >= 1 so none is empty
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < edges.size else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def bucket_starts(keys: np.ndarray) -> np.ndarray:
+    """Start index of every run of equal ``keys`` (sorted bucket ids, e.g. week numbers)."""
+    if keys.size == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+
+
+def ohlc(values: np.ndarray, starts: np.ndarray) -> dict[str, np.ndarray]:
+    """Open / high / low / close of the buckets beginning at ``starts``."""
+    if starts.size == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return {"open": empty, "high": empty, "low": empty, "close": empty}
+    ends = np.concatenate((starts[1:], [values.size])) - 1
+    return {
+        "open": values[starts],
+        "high": np.maximum.reduceat(values, starts),
+        "low": np.minimum.reduceat(values, starts),
+        "close": values[ends],
+    }
+
+
+def analyze(columns: dict[str, np.ndarray], window: int) -> dict:
+    """Stats and rolling series for aligned columns (all of equal length).
+
+    Rolling arrays are aligned with the input dates; return-based series
+    start with a NaN because the first day has no return.
+    """
+    returns = {metric: log_returns(values) for metric, values in columns.items()}
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR) * 100
+
+    report: dict = {"analytics": {}}
+    for metric, values in columns.items():
+        rolling_vol = np.concatenate(([np.nan], rolling_std(returns[metric], window) * annualize))
+        total_return = float((values[-1] / values[0] - 1) * 100) if values.size and values[0] else None
+        report["analytics"][metric] = {
+            **summary(values),
+            "totalReturn": total_return,
+            "volatility": annualized_volatility(returns[metric]),
+            "maxDrawdown": max_drawdown(values),
+            "rollingMean": to_json_list(rolling_mean(values, window)),
+            "rollingVolatility": to_json_list(rolling_vol[: values.size]),
+            "drawdown": to_json_list(drawdown(values)),
+        }
+
+    if len(columns) == 2:
+        a, b = (returns[metric] for metric in columns)
+        rolling_corr = np.concatenate(([np.nan], rolling_correlation(a, b, window)))
+        report["correlation"] = {
+            "metrics": list(columns),
+            "value": correlation(a, b),
+            "rolling": to_json_list(rolling_corr[: next(iter(columns.values())).size]),
+        }
+
+    return report
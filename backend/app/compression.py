@@ -0,0 +1,124 @@
+"""gzip / brotli response compression negotiated from ``Accept-Encoding``.
+
+``CompressionMiddleware`` compresses complete (non-streaming) responses of a
+compressible type once they reach ``COMPRESSION_MIN_BYTES``. Responses that
+already carry a ``Content-Encoding`` pass through untouched, which is how the
+series endpoints serve the compressed bodies memoized in the series cache.
+Brotli is used when the ``brotli`` package is installed.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# Preferred first when the client rates them equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best supported encoding for an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding:
+        return None
+
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def should_compress(body: bytes) -> bool:
+    return len(body) >= COMPRESSION_MIN_BYTES
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding)
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body gets compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = {name.lower(): value for name, value in start["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            body = message.get("body", b"")
+
+            # Streaming bodies and already-encoded responses go out as they are
+            if message.get("more_body") or b"content-encoding" in headers or not _is_compressible(content_type):
+                await send(start)
+                await send(message)
+                return
+
+            # Caches must key on Accept-Encoding since the body depends on it
+            vary = headers.get(b"vary", b"")
+            raw_headers = [
+                (name, value) for name, value in start["headers"] if name.lower() not in (b"content-length", b"vary")
+            ]
+            if b"accept-encoding" not in vary.lower():
+                vary = vary + b", Accept-Encoding" if vary else b"Accept-Encoding"
+            raw_headers.append((b"vary", vary))
+            if encoding is not None and should_compress(body):
+                body = compress(body, encoding)
+                raw_headers.append((b"content-encoding", encoding.encode()))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+
+            await send({**start, "headers": raw_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
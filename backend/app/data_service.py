@@ -1,16 +1,26 @@
-﻿from datetime import date, datetime, timedelta
+﻿from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
 from typing import Literal
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.models import MarketSeries
+from app.models import MarketPeriodStats, MarketSeries, market_series_aligned
+from app.registry import DEFAULT_METRICS, REGISTRY
 
-MetricType = Literal["kospi", "usdkrw"]
+# Any metric id in the registry
+MetricType = str
 PeriodType = Literal["1d", "1w", "1m", "custom"]
 
 PERIOD_DAYS = {"1d": 2, "1w": 7, "1m": 30, "3m": 90, "1y": 365}
 
+# Metrics that must all have a value on a date for it to be served
+METRICS: tuple[str, ...] = DEFAULT_METRICS
+ALL_METRICS: tuple[str, ...] = tuple(REGISTRY)
+
+MIN_POINTS_LOOKBACK_DAYS = 30
+
 
 def _parse_date(value: str | None) -> date | None:
     if not value:
@@ -18,70 +28,134 @@ def _parse_date(value: str | None) -> date | None:
     return datetime.strptime(value, "%Y-%m-%d").date()
 
 
-def _get_common_dates(db: Session, query_start: date, query_end: date) -> set[date]:
-    """Get dates where both kospi and usdkrw data exist."""
-    kospi_stmt = (
-        select(MarketSeries.date)
-        .where(MarketSeries.metric == "kospi")
-        .where(MarketSeries.date >= query_start)
-        .where(MarketSeries.date <= query_end)
-    )
-    usdkrw_stmt = (
-        select(MarketSeries.date)
-        .where(MarketSeries.metric == "usdkrw")
-        .where(MarketSeries.date >= query_start)
-        .where(MarketSeries.date <= query_end)
+def alignment_group(metrics: Sequence[str]) -> tuple[str, ...]:
+    """Metrics a request is aligned on: the default ones plus any others it asks for."""
+    return METRICS + tuple(sorted(set(metrics) - set(METRICS)))
+
+
+def _aligned_series_stmt(metric: MetricType, query_start: date, query_end: date):
+    """Select (date, value) of ``metric`` on dates where every metric of its group has data.
+
+    A range scan over the date key of the wide table; alignment is a NOT NULL
+    filter on the group's columns.
+    """
+    table = market_series_aligned
+    return (
+        select(table.c.date, table.c[metric].label("value"))
+        .where(*(table.c[other].is_not(None) for other in alignment_group([metric])))
+        .where(table.c.date >= query_start)
+        .where(table.c.date <= query_end)
+        .order_by(table.c.date.asc())
     )
 
-    kospi_dates = {row[0] for row in db.execute(kospi_stmt).all()}
-    usdkrw_dates = {row[0] for row in db.execute(usdkrw_stmt).all()}
 
-    return kospi_dates & usdkrw_dates
+def _aligned_table_stmt(metrics: Sequence[str] = METRICS):
+    """Select (date, <value per metric>...) for every date where all ``metrics`` have data."""
+    table = market_series_aligned
+    return (
+        select(table.c.date, *(table.c[metric] for metric in metrics))
+        .where(*(table.c[metric].is_not(None) for metric in metrics))
+        .order_by(table.c.date.asc())
+    )
 
 
-def get_series_from_db(
-    db: Session,
-    metric: MetricType,
+def resolve_range(
     period: PeriodType,
     start_date: str | None = None,
     end_date: str | None = None,
-) -> list[dict]:
+    today: date | None = None,
+) -> tuple[date, date]:
+    """Turn a period or a custom start/end pair into an inclusive date range."""
     start = _parse_date(start_date)
     end = _parse_date(end_date)
 
     if start and end:
-        query_start = start
-        query_end = end
-    else:
-        days = PERIOD_DAYS.get(period, 30)
-        query_end = date.today()
-        query_start = query_end - timedelta(days=days - 1)
+        return start, end
 
-    common_dates = _get_common_dates(db, query_start, query_end)
+    days = PERIOD_DAYS.get(period, 30)
+    query_end = today or date.today()
+    return query_end - timedelta(days=days - 1), query_end
+
+
+def aligned_slice(ordinals: Sequence[int], query_start: date, query_end: date) -> tuple[int, int]:
+    """Index bounds of a date range within sorted aligned date ordinals."""
+    lo = bisect_left(ordinals, query_start.toordinal())
+    hi = bisect_right(ordinals, query_end.toordinal())
 
     # Ensure at least 2 data points for line chart
-    if len(common_dates) < 2:
-        extended_start = query_start - timedelta(days=30)
-        all_common = _get_common_dates(db, extended_start, query_end)
-        sorted_dates = sorted(all_common, reverse=True)[:2]
-        common_dates = set(sorted_dates)
-
-    stmt = (
-        select(MarketSeries.date, MarketSeries.value)
-        .where(MarketSeries.metric == metric)
-        .where(MarketSeries.date.in_(common_dates))
-        .order_by(MarketSeries.date.asc())
-    )
+    if hi - lo < 2:
+        lead_in = bisect_left(ordinals, (query_start - timedelta(days=MIN_POINTS_LOOKBACK_DAYS)).toordinal())
+        lo = max(lead_in, hi - 2)
+    return lo, hi
+
+
+def get_data_version(db: Session) -> tuple[str, datetime | None]:
+    """Cheap fingerprint of the served data that changes whenever a sync writes rows.
+
+    Covers market_series and the precomputed period stats. Returns the
+    version string and the latest market_series ``updated_at`` timestamp.
+    """
+    row_count, last_updated, stats_refreshed = db.execute(
+        select(
+            select(func.count(MarketSeries.id)).scalar_subquery(),
+            select(func.max(MarketSeries.updated_at)).scalar_subquery(),
+            select(func.max(MarketPeriodStats.refreshed_at)).scalar_subquery(),
+        )
+    ).one()
+    stamps = [value.isoformat() if value else "-" for value in (last_updated, stats_refreshed)]
+    return f"{row_count}:{stamps[0]}:{stamps[1]}", last_updated
+
+
+def get_aligned_table(db: Session, metrics: Sequence[str] = METRICS) -> list[tuple]:
+    """Load every aligned row as ``(date, value_for_metrics[0], value_for_metrics[1], ...)``."""
+    return [tuple(row) for row in db.execute(_aligned_table_stmt(metrics)).all()]
+
+
+def get_wide_table(
+    db: Session, metrics: Sequence[str] = ALL_METRICS
+) -> tuple[list[date], dict[str, list[float | None]]]:
+    """Every date any of ``metrics`` has data on, with one value list per metric (None where missing)."""
+    table = market_series_aligned
+    stmt = select(table.c.date, *(table.c[metric] for metric in metrics)).order_by(table.c.date.asc())
+    dates: list[date] = []
+    values: dict[str, list[float | None]] = {metric: [] for metric in metrics}
+    for row in db.execute(stmt):
+        dates.append(row[0])
+        for metric, value in zip(metrics, row[1:]):
+            values[metric].append(value)
+    return dates, values
 
+
+def get_series_from_db(
+    db: Session,
+    metric: MetricType,
+    period: PeriodType,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> list[dict]:
+    query_start, query_end = resolve_range(period, start_date, end_date)
+
+    # Fetch a 30-day lead-in with the same query so the "at least 2 points"
+    # fallback never needs a second round-trip.
+    stmt = _aligned_series_stmt(metric, query_start - timedelta(days=MIN_POINTS_LOOKBACK_DAYS), query_end)
     rows = db.execute(stmt).all()
-    return [{"date": row.date.isoformat(), "value": float(row.value)} for row in rows]
+
+    in_range = [row for row in rows if row.date >= query_start]
+    # Ensure at least 2 data points for line chart
+    if len(in_range) < 2:
+        in_range = rows[-2:]
+
+    return [{"date": row.date.isoformat(), "value": float(row.value)} for row in in_range]
 
 
 def calculate_stats(series: list[dict]) -> dict:
-    if not series:
+    return calculate_value_stats([item["value"] for item in series])
+
+
+def calculate_value_stats(values: list[float]) -> dict:
+    if not values:
         return {}
 
-    values = [item["value"] for item in series]
     min_val = min(values)
     max_val = max(values)
     avg_val = sum(values) / len(values)
@@ -1,5 +1,9 @@
-﻿import os
-from sqlalchemy import create_engine
+﻿import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from app import config  # noqa: F401
@@ -9,9 +13,99 @@ DATABASE_URL = os.getenv("DATABASE_URL", "")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
+# Pool sizing for the small Render plan; pool_size + max_overflow per process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Read endpoints use an asyncpg engine when DB_ASYNC=1
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# With DB_ASYNC=1 the asyncpg engine gets DB_POOL_SIZE / DB_MAX_OVERFLOW and the sync
+# engine (cache reloads, /api/export, /admin/sync) only this much, so a process holds at
+# most DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_SYNC_POOL_SIZE + DB_SYNC_MAX_OVERFLOW connections
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "2"))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "1"))
+
+_POOL_OPTIONS = {
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+_SYNC_POOL_OPTIONS = (
+    {**_POOL_OPTIONS, "pool_size": DB_SYNC_POOL_SIZE, "max_overflow": DB_SYNC_MAX_OVERFLOW}
+    if DB_ASYNC
+    else _POOL_OPTIONS
 )
 
+engine = create_engine(DATABASE_URL, **_SYNC_POOL_OPTIONS)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def open_pool_connections(count: int = _SYNC_POOL_OPTIONS["pool_size"]) -> int:
+    """Open ``count`` pooled connections at once and return them to the pool.
+
+    Holding them concurrently forces the pool to actually create ``count``
+    connections (TCP, TLS, auth) instead of handing the same one back.
+    """
+
+    def connect(_):
+        conn = engine.connect()
+        conn.execute(text("SELECT 1"))
+        return conn
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(connect, i) for i in range(count)]
+    # Return every connection that did open before reporting a failure
+    conns = [future.result() for future in futures if future.exception() is None]
+    for conn in conns:
+        conn.close()
+    for future in futures:
+        if future.exception() is not None:
+            raise future.exception()
+    return len(conns)
+
+
+def _async_database_url(url: str):
+    """Rewrite a sync Postgres URL (psycopg2, libpq style) for asyncpg."""
+    parsed = make_url(url)
+    query = dict(parsed.query)
+    # asyncpg spells libpq's sslmode as ssl
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    query["prepared_statement_cache_size"] = str(DB_STATEMENT_CACHE_SIZE)
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(_async_database_url(DATABASE_URL), **_POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def open_async_pool_connections(count: int = DB_POOL_SIZE) -> int:
+    """``open_pool_connections`` for the asyncpg engine."""
+    if async_engine is None:
+        return 0
+
+    async def connect():
+        conn = await async_engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(*(connect() for _ in range(count)), return_exceptions=True)
+    conns = [result for result in results if not isinstance(result, BaseException)]
+    for conn in conns:
+        await conn.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(conns)
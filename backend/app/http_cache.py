@@ -0,0 +1,66 @@
+﻿"""HTTP caching helpers (ETag / Last-Modified / Cache-Control) for series responses.
+
+Series responses only change when a sync writes rows or when the calendar
+day rolls over (period windows are relative to today), so the ETag is derived
+from the series cache data version plus the date and the query string, and
+``max-age`` runs until the next scheduled sync or midnight, whichever is first.
+"""
+
+import hashlib
+import os
+from datetime import datetime, time, timedelta, timezone
+from email.utils import format_datetime
+
+from fastapi import Request
+
+from app import telemetry
+
+# Hour (UTC) of the daily cron sync, see .github/workflows/cron_sync.yml
+SYNC_CRON_HOUR_UTC = int(os.getenv("SYNC_CRON_HOUR_UTC", "0"))
+
+# Upper bound for max-age, e.g. to shorten it when /admin/sync is used ad hoc
+MAX_AGE_CAP_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_CAP", "86400"))
+
+
+def build_etag(version: str | None, *parts: str) -> str:
+    digest = hashlib.sha1("|".join([version or "-", *parts]).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def seconds_until_next_sync(now: datetime | None = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+
+    next_midnight = datetime.combine(today + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    next_cron = datetime.combine(today, time(hour=SYNC_CRON_HOUR_UTC), tzinfo=timezone.utc)
+    if next_cron <= now:
+        next_cron += timedelta(days=1)
+
+    remaining = min(next_midnight, next_cron) - now
+    return max(0, min(int(remaining.total_seconds()), MAX_AGE_CAP_SECONDS))
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on either side
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    matched = _etag_matches(request.headers.get("if-none-match"), etag)
+    telemetry.record_cache("http", "not_modified" if matched else "full")
+    return matched
+
+
+def cache_headers(etag: str, last_modified: datetime | None) -> dict[str, str]:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={seconds_until_next_sync()}",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
@@ -0,0 +1,166 @@
+"""Exchange-rate fetcher for the Korea Eximbank ``exchangeJSON`` API.
+
+One request returns the rates of every currency for a date, so each response
+is parsed into a record for every ``exim`` metric in the registry. Records
+are ``{"metric", "date", "value", "source"}`` dicts ready for the bulk writer.
+"""
+
+import os
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import requests
+
+from app.jobs import response_cache
+from app.jobs.http_client import Deadline, TokenBucket, build_session
+from app.registry import metrics_for_source
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+EXIM_API_URL = os.getenv("EXIM_API_URL", "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON")
+EXIM_SOURCE = "exim"
+
+# Backfill tuning (the EXIM key has a daily request quota)
+EXIM_CONCURRENCY = int(os.getenv("EXIM_CONCURRENCY", "8"))
+EXIM_RATE_PER_SEC = float(os.getenv("EXIM_RATE_PER_SEC", "5"))
+EXIM_RETRIES = int(os.getenv("EXIM_RETRIES", "3"))
+
+
+# ``result`` of each item: 1 success, 2 data code error, 3 auth key error, 4 daily request limit exceeded
+EXIM_RESULT_OK = 1
+
+
+def check_exim_response(data: list[dict] | None) -> None:
+    """Raise when the API reports an error (quota, auth key, ...) inside an HTTP 200 answer.
+
+    An empty list is a valid answer for weekends and holidays.
+    """
+    for item in data or []:
+        result = item.get("result")
+        if result is not None and int(result) != EXIM_RESULT_OK:
+            raise RuntimeError(f"EXIM API error: result {result}")
+
+
+def parse_exim_response(data: list[dict] | None, search_date: date) -> list[dict]:
+    """Records of every registered currency found in one ``exchangeJSON`` response."""
+    if not data:
+        return []
+
+    by_code = {metric.code: metric for metric in metrics_for_source(EXIM_SOURCE)}
+    records = []
+    for item in data:
+        metric = by_code.get(item.get("cur_unit"))
+        if metric is None:
+            continue
+        value = metric.parser(item)
+        if value:
+            records.append({"metric": metric.id, "date": search_date, "value": value, "source": EXIM_SOURCE})
+    return records
+
+
+def fetch_exim_rates(api_key: str, search_date: date, session: requests.Session | None = None) -> list[dict]:
+    """Fetch all registered currencies for one date.
+
+    Request errors (and replay-mode cache misses) propagate so callers can
+    tell them apart from "no data" (weekends and holidays return an empty list).
+    """
+    params = {
+        "authkey": api_key,
+        "searchdate": search_date.strftime("%Y%m%d"),
+        "data": "AP01",
+    }
+    data = response_cache.get_json(
+        session or requests,
+        EXIM_API_URL,
+        params,
+        api="exim",
+        latest_day=search_date,
+        validate=check_exim_response,
+        timeout=10,
+        verify=False,
+    )
+    return parse_exim_response(data, search_date)
+
+
+def fetch_exim_days(
+    api_key: str,
+    days: list[date],
+    session: requests.Session | None = None,
+    concurrency: int = EXIM_CONCURRENCY,
+    rate_per_sec: float = EXIM_RATE_PER_SEC,
+    deadline: Deadline | None = None,
+) -> tuple[list[dict], list[date]]:
+    """Fetch the given days concurrently over one keep-alive session.
+
+    At most ``concurrency`` requests are in flight and a token bucket keeps the
+    request rate under ``rate_per_sec``; days still waiting for a token when
+    ``deadline`` runs out fail without a request. Failed days are logged and
+    returned next to the records, which are sorted by date. A caller-provided
+    ``session`` is used as is and left open.
+    """
+    if not days:
+        return [], []
+
+    bucket = TokenBucket(rate_per_sec)
+    own_session = session is None
+    if own_session:
+        session = build_session(pool_size=concurrency, retries=EXIM_RETRIES)
+
+    def fetch(search_date: date) -> list[dict]:
+        bucket.acquire(deadline)
+        return fetch_exim_rates(api_key, search_date, session=session)
+
+    results = []
+    failed = []
+    done = 0
+    step = max(1, len(days) // 10)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(fetch, day): day for day in days}
+            for future in as_completed(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as exc:
+                    print(f"[exim] API error for {futures[future]}: {exc}", flush=True)
+                    failed.append(futures[future])
+                done += 1
+                if done % step == 0 or done == len(days):
+                    print(f"[exim] progress: {done}/{len(days)} days ({len(results)} rates)", flush=True)
+    finally:
+        if own_session:
+            session.close()
+
+    results.sort(key=lambda item: (item["date"], item["metric"]))
+    return results, sorted(failed)
+
+
+def fetch_exim_range(
+    api_key: str,
+    start_date: date,
+    end_date: date,
+    concurrency: int = EXIM_CONCURRENCY,
+    rate_per_sec: float = EXIM_RATE_PER_SEC,
+    strict: bool = False,
+) -> list[dict]:
+    """Fetch every weekday in the range (see ``fetch_exim_days``).
+
+    Failed days are skipped, or raise a ``RuntimeError`` listing them once all
+    other days are done when ``strict`` is set.
+    """
+    days = []
+    current = start_date
+    while current <= end_date:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+
+    results, failed = fetch_exim_days(api_key, days, concurrency=concurrency, rate_per_sec=rate_per_sec)
+    if failed:
+        message = f"{len(failed)} day(s) failed between {start_date} and {end_date}: " + ", ".join(
+            day.isoformat() for day in failed
+        )
+        if strict:
+            raise RuntimeError(f"EXIM API: {message}")
+        print(f"[exim] {message}", flush=True)
+    return results
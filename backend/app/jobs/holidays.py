@@ -0,0 +1,51 @@
+"""Weekday market holidays, applied to ``market_closed_days`` by every sync.
+
+The calendar lives in ``market_holidays.csv`` (``date,scope,name``) so a new
+year is added by appending rows, without a migration. ``scope`` is ``all``
+for public holidays (KOSPI and every EXIM currency) or ``krx`` for KRX-only
+closures (Labor Day, year-end), on which exchange rates are still published.
+Days missing from the file are still resolved by the sync's no-data grace
+rule, just with a few extra API calls first.
+"""
+
+import csv
+import os
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import MarketClosedDay
+from app.registry import REGISTRY
+
+HOLIDAYS_FILE = Path(os.getenv("MARKET_HOLIDAYS_FILE", str(Path(__file__).with_name("market_holidays.csv"))))
+
+SCOPES = ("all", "krx")
+
+
+def load_holidays(path: Path = HOLIDAYS_FILE) -> list[tuple[date, str, str]]:
+    """``(date, scope, name)`` for every row of the calendar file."""
+    with path.open(encoding="utf-8", newline="") as fp:
+        rows = [(date.fromisoformat(row["date"]), row["scope"], row["name"]) for row in csv.DictReader(fp)]
+    for day, scope, _ in rows:
+        if scope not in SCOPES:
+            raise ValueError(f"{path}: unknown scope {scope!r} on {day}")
+    return rows
+
+
+def holiday_rows(holidays: list[tuple[date, str, str]]) -> list[dict]:
+    """``market_closed_days`` rows: ``all`` days for every metric, ``krx`` days for KOSPI only."""
+    return [
+        {"metric": metric.id, "date": day, "reason": f"holiday: {name}"}
+        for day, scope, name in holidays
+        for metric in REGISTRY.values()
+        if scope == "all" or metric.source == "kospi"
+    ]
+
+
+def apply_holidays(db: Session, path: Path = HOLIDAYS_FILE) -> None:
+    """Insert the calendar's closed days that are not recorded yet (caller commits)."""
+    rows = holiday_rows(load_holidays(path))
+    if rows:
+        db.execute(insert(MarketClosedDay).values(rows).on_conflict_do_nothing())
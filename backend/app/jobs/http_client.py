@@ -0,0 +1,238 @@
+"""Shared HTTP plumbing for the ingestion jobs.
+
+Pooled keep-alive sessions and a token bucket for the backfills, plus the
+guards of the daily sync: a ``Deadline`` shared by every request of a run,
+per-host circuit breakers and ``GuardedSession``, which retries with
+jittered backoff inside both.
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(pool_size: int = 10, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """Keep-alive session sized for ``pool_size`` concurrent requests per host.
+
+    Connection errors and 429/5xx responses are retried with exponential
+    backoff (``backoff * 2 ** attempt`` seconds).
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: "Deadline | None" = None) -> None:
+        """Block until a token is available; raises ``DeadlineExceeded`` rather than wait past ``deadline``."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                wait = deadline.cap(wait)
+            time.sleep(wait)
+
+
+class DeadlineExceeded(RuntimeError):
+    """The overall time budget ran out before the request could be sent."""
+
+
+class CircuitOpen(RuntimeError):
+    """The host failed repeatedly and is not being called until its cool-down ends."""
+
+
+class Deadline:
+    """Time budget shared by every request of one job; ``seconds=None`` means unbounded."""
+
+    def __init__(self, seconds: float | None) -> None:
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def cap(self, seconds: float) -> float:
+        """``seconds`` cut down to what is left of the budget; raises once it is spent."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        if remaining <= 0:
+            raise DeadlineExceeded("sync time budget exhausted")
+        return min(seconds, remaining)
+
+
+class CircuitBreaker:
+    """Stops calls to a host after ``failure_threshold`` consecutive failures.
+
+    Once open, calls fail fast with ``CircuitOpen`` for ``reset_seconds``;
+    after that a single probe goes through (half-open) and its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 3, reset_seconds: float = 60.0) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._probing:
+                raise CircuitOpen(f"circuit open for {self.host}")
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self) -> None:
+        """End a call whose outcome says nothing about the host (e.g. an unexpected error)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url: str, failure_threshold: int = 3, reset_seconds: float = 60.0) -> CircuitBreaker:
+    """The process-wide breaker of ``url``'s host (created on first use)."""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host, failure_threshold, reset_seconds)
+        return breaker
+
+
+class GuardedSession(requests.Session):
+    """Session whose requests retry with full-jitter backoff under a deadline and a breaker.
+
+    Each attempt first asks the host's ``CircuitBreaker`` and gets a timeout
+    no longer than what is left of ``deadline``. Connection errors, timeouts
+    and 429/5xx responses count as failures and are retried up to ``retries``
+    times, sleeping ``uniform(0, backoff * 2 ** attempt)`` seconds in between
+    (never past the deadline). The last 429/5xx response is returned as is, so
+    ``raise_for_status`` still reports it.
+    """
+
+    def __init__(
+        self,
+        deadline: Deadline,
+        retries: int = 2,
+        backoff: float = 0.5,
+        failure_threshold: int = 3,
+        reset_seconds: float = 60.0,
+    ) -> None:
+        super().__init__()
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+    def request(self, method, url, *args, timeout: float = 30, **kwargs):
+        breaker = breaker_for(url, self.failure_threshold, self.reset_seconds)
+        attempt = 0
+        while True:
+            # Spend the budget check before taking the half-open probe slot
+            attempt_timeout = self.deadline.cap(timeout)
+            breaker.before_call()
+            try:
+                resp = super().request(method, url, *args, timeout=attempt_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return resp
+                breaker.record_failure()
+                if attempt >= self.retries:
+                    return resp
+                resp.close()
+
+            delay = random.uniform(0, self.backoff * 2**attempt)
+            remaining = self.deadline.remaining()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded(f"sync time budget exhausted while retrying {urlsplit(url).netloc}")
+            time.sleep(delay)
+            attempt += 1
+
+
+def build_guarded_session(deadline: Deadline, pool_size: int = 10, **guards) -> GuardedSession:
+    """``GuardedSession`` with a keep-alive pool for ``pool_size`` concurrent requests per host.
+
+    The adapter itself does not retry; ``guards`` are passed to ``GuardedSession``.
+    """
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session = GuardedSession(deadline, **guards)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,185 @@
+"""KOSPI index fetcher for the data.go.kr GetMarketIndexInfoService API.
+
+Long ranges are split into chunks of ``KOSPI_CHUNK_DAYS`` days and every chunk
+is paged through ``pageNo`` / ``totalCount``, so nothing is truncated at
+``numOfRows``. Chunks sit on fixed boundaries rather than following the
+requested range (the newest one ends in the future), so every run asks for the
+same pages and the response cache can answer them, including in replay mode;
+records outside the requested range are dropped. Pages are fetched
+concurrently over one pooled session and handed to ``on_records`` on the
+calling thread as they arrive, which lets the caller stream them into the bulk
+writer with its own DB session.
+"""
+
+import math
+import os
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+
+import requests
+
+from app.jobs import response_cache
+from app.jobs.http_client import build_session
+from app.registry import REGISTRY
+
+KOSPI_API_URL = os.getenv(
+    "KOSPI_API_URL",
+    "https://apis.data.go.kr/1160100/service/GetMarketIndexInfoService/getStockMarketIndex",
+)
+KOSPI_INDEX_NAME = REGISTRY["kospi"].code
+KOSPI_SOURCE = "data.go.kr"
+
+KOSPI_PAGE_SIZE = int(os.getenv("KOSPI_PAGE_SIZE", "1000"))
+KOSPI_CHUNK_DAYS = int(os.getenv("KOSPI_CHUNK_DAYS", "365"))
+KOSPI_CONCURRENCY = int(os.getenv("KOSPI_CONCURRENCY", "4"))
+
+EPOCH = date(1970, 1, 1)
+
+
+def check_kospi_response(data: dict) -> None:
+    """Raise on an error reported in the body of an HTTP 200 answer (``header.resultCode`` other than ``00``)."""
+    header = (data.get("response") or {}).get("header") or {}
+    code = header.get("resultCode")
+    if code != "00":
+        raise RuntimeError(f"KOSPI API error {code}: {header.get('resultMsg')}")
+
+
+def parse_kospi_response(data: dict) -> tuple[list[dict], int]:
+    """Return the parsed records of one page and the total row count of the query."""
+    body = data.get("response", {}).get("body", {}) or {}
+    total_count = int(body.get("totalCount") or 0)
+
+    items = body.get("items") or {}
+    items = items.get("item", []) if isinstance(items, dict) else []
+    if isinstance(items, dict):
+        items = [items]
+
+    records = []
+    for item in items:
+        bas_dt = item.get("basDt", "")
+        value = REGISTRY["kospi"].parser(item)
+        if not bas_dt or not value:
+            continue
+        parsed_date = datetime.strptime(bas_dt, "%Y%m%d").date()
+        records.append({"date": parsed_date, "value": value, "source": KOSPI_SOURCE})
+
+    return records, total_count
+
+
+def fetch_kospi_page(
+    session: requests.Session,
+    api_key: str,
+    start_date: date,
+    end_date: date,
+    page_no: int = 1,
+    page_size: int = KOSPI_PAGE_SIZE,
+) -> tuple[list[dict], int]:
+    params = {
+        "serviceKey": api_key,
+        "numOfRows": page_size,
+        "pageNo": page_no,
+        "resultType": "json",
+        "idxNm": KOSPI_INDEX_NAME,
+        "beginBasDt": start_date.strftime("%Y%m%d"),
+        "endBasDt": end_date.strftime("%Y%m%d"),
+    }
+    data = response_cache.get_json(
+        session,
+        KOSPI_API_URL,
+        params,
+        api="kospi",
+        latest_day=end_date,
+        validate=check_kospi_response,
+        timeout=30,
+    )
+    return parse_kospi_response(data)
+
+
+def _split_range(start_date: date, end_date: date, chunk_days: int) -> list[tuple[date, date]]:
+    """Chunks on multiples of ``chunk_days`` since 1970-01-01 covering the range.
+
+    Every chunk spans its full ``chunk_days`` even when that reaches past the
+    requested end (or today), so its request and cache key never change.
+    """
+    epoch = EPOCH.toordinal()
+    first = (start_date.toordinal() - epoch) // chunk_days
+    last = (end_date.toordinal() - epoch) // chunk_days
+    chunks = []
+    for index in range(first, last + 1):
+        chunk_start = date.fromordinal(epoch + index * chunk_days)
+        chunks.append((chunk_start, chunk_start + timedelta(days=chunk_days - 1)))
+    return chunks
+
+
+def fetch_kospi_range(
+    api_key: str,
+    start_date: date,
+    end_date: date,
+    on_records: Callable[[list[dict]], None] | None = None,
+    concurrency: int = KOSPI_CONCURRENCY,
+    page_size: int = KOSPI_PAGE_SIZE,
+    chunk_days: int = KOSPI_CHUNK_DAYS,
+    strict: bool = False,
+    session: requests.Session | None = None,
+) -> list[dict]:
+    """Fetch every KOSPI close between ``start_date`` and ``end_date`` (inclusive).
+
+    ``on_records`` is called on the calling thread with each page's records as
+    soon as the page arrives. Failed pages are logged and skipped, or raise a
+    ``RuntimeError`` once all other pages are done when ``strict`` is set. The
+    full result is also returned, sorted by date. A caller-provided
+    ``session`` is used as is and left open.
+    """
+    own_session = session is None
+    if own_session:
+        session = build_session(pool_size=concurrency)
+    results: list[dict] = []
+    failed_pages = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: dict[Future, tuple[date, date, int]] = {}
+
+            def submit(chunk_start: date, chunk_end: date, page_no: int) -> None:
+                future = executor.submit(
+                    fetch_kospi_page, session, api_key, chunk_start, chunk_end, page_no, page_size
+                )
+                pending[future] = (chunk_start, chunk_end, page_no)
+
+            for chunk_start, chunk_end in _split_range(start_date, end_date, chunk_days):
+                submit(chunk_start, chunk_end, 1)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_start, chunk_end, page_no = pending.pop(future)
+                    try:
+                        records, total_count = future.result()
+                    except Exception as exc:
+                        failed_pages += 1
+                        print(f"[kospi] API error for {chunk_start}~{chunk_end} page {page_no}: {exc}", flush=True)
+                        continue
+
+                    # The first page of a chunk tells us how many more to request
+                    if page_no == 1:
+                        for next_page in range(2, math.ceil(total_count / page_size) + 1):
+                            submit(chunk_start, chunk_end, next_page)
+
+                    records = [item for item in records if start_date <= item["date"] <= end_date]
+                    if records:
+                        results.extend(records)
+                        if on_records is not None:
+                            on_records(records)
+    finally:
+        if own_session:
+            session.close()
+
+    if failed_pages:
+        message = f"{failed_pages} page(s) failed between {start_date} and {end_date}"
+        if strict:
+            raise RuntimeError(f"KOSPI API: {message}")
+        print(f"[kospi] {message}", flush=True)
+
+    results.sort(key=lambda item: item["date"])
+    return results
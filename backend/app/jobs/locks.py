@@ -0,0 +1,31 @@
+"""Postgres advisory lock that keeps sync runs from overlapping.
+
+``cron_sync.py`` and the in-app job runner take the same lock, so a manual
+``/admin/sync`` and the daily cron job never write at the same time.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+SYNC_LOCK_ID = 12345
+
+
+@contextmanager
+def advisory_lock(engine: Engine, lock_id: int = SYNC_LOCK_ID) -> Iterator[bool]:
+    """Try to take the lock; yields False at once if another session holds it.
+
+    Advisory locks belong to the database session, so the lock is taken and
+    released on one dedicated connection that stays checked out meanwhile.
+    """
+    with engine.connect() as conn:
+        locked = bool(conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar())
+        conn.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+                conn.commit()
@@ -0,0 +1,155 @@
+"""On-disk cache of raw KOSPI / EXIM API responses.
+
+Requests are keyed by endpoint and parameters (API keys excluded), and each
+key points at a gzip blob named after the SHA-256 of the response body, so
+identical responses (e.g. the empty EXIM answer for every holiday) are stored
+once::
+
+    <API_CACHE_DIR>/keys/ab/ab12....json   {"url", "params", "blob", "fetchedAt", "expiresAt"}
+    <API_CACHE_DIR>/blobs/cd/cd34....gz
+
+Responses covering only days older than ``API_CACHE_RECENT_DAYS`` never
+expire, since past closes do not change; anything touching a recent day is
+reused for ``API_CACHE_RECENT_TTL_SECONDS``. ``API_CACHE_MODE`` is ``on``
+(default), ``off``, or ``replay``, which serves from the cache only, expired
+entries included, and raises ``CacheMiss`` instead of calling the API (see
+``seed_initial --replay``).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from app.telemetry import observe_external, record_cache
+
+API_CACHE_DIR = Path(os.getenv("API_CACHE_DIR", str(Path(__file__).resolve().parents[2] / ".api-cache")))
+API_CACHE_MODE = os.getenv("API_CACHE_MODE", "on")
+API_CACHE_RECENT_DAYS = int(os.getenv("API_CACHE_RECENT_DAYS", "7"))
+API_CACHE_RECENT_TTL_SECONDS = float(os.getenv("API_CACHE_RECENT_TTL_SECONDS", "3600"))
+
+# Credentials never become part of a cache key
+AUTH_PARAMS = frozenset({"serviceKey", "authkey"})
+
+_mode = API_CACHE_MODE
+
+
+class CacheMiss(RuntimeError):
+    """Raised in replay mode when a request has no cached response."""
+
+
+def set_mode(mode: str) -> None:
+    if mode not in {"on", "off", "replay"}:
+        raise ValueError(f"Unsupported API cache mode: {mode}")
+    global _mode
+    _mode = mode
+
+
+def _public_params(params: dict) -> dict[str, str]:
+    return {name: str(value) for name, value in sorted(params.items()) if name not in AUTH_PARAMS}
+
+
+def request_key(url: str, params: dict) -> str:
+    canonical = json.dumps([url, _public_params(params)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _key_path(key: str) -> Path:
+    return API_CACHE_DIR / "keys" / key[:2] / f"{key}.json"
+
+
+def _blob_path(digest: str) -> Path:
+    return API_CACHE_DIR / "blobs" / digest[:2] / f"{digest}.gz"
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Concurrent fetchers may write the same key; rename keeps readers from seeing half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _read(key: str, allow_expired: bool = False) -> bytes | None:
+    try:
+        entry = json.loads(_key_path(key).read_text(encoding="utf-8"))
+        if not allow_expired and entry["expiresAt"] is not None and entry["expiresAt"] <= time.time():
+            return None
+        return gzip.decompress(_blob_path(entry["blob"]).read_bytes())
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _store(key: str, url: str, params: dict, body: bytes, latest_day: date) -> None:
+    digest = hashlib.sha256(body).hexdigest()
+    blob = _blob_path(digest)
+    if not blob.exists():
+        _write_atomic(blob, gzip.compress(body, mtime=0))
+
+    recent = (date.today() - latest_day).days < API_CACHE_RECENT_DAYS
+    entry = {
+        "url": url,
+        "params": _public_params(params),
+        "blob": digest,
+        "fetchedAt": datetime.now(timezone.utc).isoformat(),
+        "expiresAt": time.time() + API_CACHE_RECENT_TTL_SECONDS if recent else None,
+    }
+    _write_atomic(_key_path(key), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+
+def _load_valid(body: bytes | None, validate: Callable[[object], None] | None):
+    if body is None:
+        return None
+    try:
+        data = json.loads(body)
+        if validate is not None:
+            validate(data)
+    except Exception:
+        # Unreadable, or an error answer cached before it was checked for
+        return None
+    return data
+
+
+def get_json(
+    session,
+    url: str,
+    params: dict,
+    *,
+    api: str,
+    latest_day: date,
+    validate: Callable[[object], None] | None = None,
+    **request_kwargs,
+):
+    """GET ``url`` and parse the JSON body, through the on-disk cache.
+
+    ``latest_day`` is the most recent date the response covers; it decides
+    whether the cached copy is permanent or short-lived. ``session`` is a
+    ``requests.Session`` (or the ``requests`` module). ``validate`` raises on
+    an error reported inside an HTTP 200 body (quota, auth, ...). HTTP errors
+    and such error payloads propagate and are never cached.
+    """
+    mode = _mode
+    key = request_key(url, params)
+    if mode != "off":
+        # Replay takes whatever we have, however old
+        data = _load_valid(_read(key, allow_expired=mode == "replay"), validate)
+        record_cache("api_response", "miss" if data is None else "hit")
+        if data is not None:
+            return data
+        if mode == "replay":
+            raise CacheMiss(f"{api}: no cached response for {_public_params(params)}")
+
+    with observe_external(api):
+        resp = session.get(url, params=params, **request_kwargs)
+        resp.raise_for_status()
+        data = resp.json()
+        if validate is not None:
+            validate(data)
+
+    if mode != "off":
+        _store(key, url, params, resp.content, latest_day)
+    return data
@@ -0,0 +1,119 @@
+"""Background execution of ``run_sync`` for ``/admin/sync``.
+
+Jobs run one at a time on a dedicated single-thread executor, under the same
+advisory lock as ``cron_sync.py``. Their state lives in this process only
+(the last ``SYNC_JOB_HISTORY`` jobs), which is enough to poll a job from the
+instance that accepted it.
+"""
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+SYNC_JOB_HISTORY = int(os.getenv("SYNC_JOB_HISTORY", "20"))
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-job")
+_jobs: OrderedDict[str, "SyncJob"] = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class SyncJob:
+    id: str
+    status: str = "queued"  # queued / running / succeeded / failed / skipped
+    submitted_at: str = field(default_factory=_now)
+    started_at: str | None = None
+    finished_at: str | None = None
+    duration_seconds: float | None = None
+    metrics: dict[str, dict] = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    _metric_started: dict[str, float] = field(default_factory=dict, repr=False)
+
+    def report(self, metric: str, status: str, **details) -> None:
+        """``run_sync`` progress callback: per-metric status, details and timing."""
+        entry = self.metrics.setdefault(metric, {})
+        if status == "running":
+            self._metric_started[metric] = time.perf_counter()
+        elif metric in self._metric_started:
+            entry["seconds"] = round(time.perf_counter() - self._metric_started[metric], 3)
+        entry.update(details)
+        entry["status"] = status
+
+    def to_dict(self) -> dict:
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "submittedAt": self.submitted_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "durationSeconds": self.duration_seconds,
+            "metrics": self.metrics,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _run(job: SyncJob, on_success: Callable[[], None] | None) -> None:
+    # Imported here so the web process only loads the ingestion stack when a sync runs
+    from app.db import SessionLocal, engine
+    from app.jobs.locks import advisory_lock
+    from app.jobs.sync_daily import run_sync
+
+    started = time.perf_counter()
+    job.started_at = _now()
+    job.status = "running"
+    try:
+        with advisory_lock(engine) as locked:
+            if not locked:
+                job.status = "skipped"
+                job.error = "Another sync process is running"
+                return
+            db = SessionLocal()
+            try:
+                job.result = run_sync(db, progress=job.report)
+            finally:
+                db.close()
+        job.status = "succeeded"
+        if on_success is not None:
+            on_success()
+    except Exception as exc:
+        job.status = "failed"
+        job.error = str(exc)
+        print(f"[sync] Job {job.id} failed: {exc}", flush=True)
+        traceback.print_exc()
+    finally:
+        job.finished_at = _now()
+        job.duration_seconds = round(time.perf_counter() - started, 3)
+
+
+def submit_sync(on_success: Callable[[], None] | None = None) -> SyncJob:
+    """Queue a sync, or return the job already queued or running in this process."""
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job.status in ("queued", "running"):
+                return job
+
+        job = SyncJob(id=uuid.uuid4().hex)
+        _jobs[job.id] = job
+        while len(_jobs) > SYNC_JOB_HISTORY:
+            _jobs.popitem(last=False)
+
+    _executor.submit(_run, job, on_success)
+    return job
+
+
+def get_job(job_id: str) -> SyncJob | None:
+    with _jobs_lock:
+        return _jobs.get(job_id)
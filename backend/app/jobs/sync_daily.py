@@ -1,11 +1,9 @@
 ﻿import os
-import urllib3
-from datetime import date, datetime, timedelta
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 
-import requests
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-from sqlalchemy import select, func
+from sqlalchemy import func, text
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
@@ -16,173 +14,287 @@ try:
 except Exception:
     pass
 
+from app.aggregates import refresh_aggregates
 from app.db import SessionLocal
-from app.models import MarketSeries
+from app.jobs.exim import EXIM_CONCURRENCY, EXIM_SOURCE, fetch_exim_days
+from app.jobs.holidays import apply_holidays
+from app.jobs.http_client import Deadline, build_guarded_session
+from app.jobs.kospi import KOSPI_CONCURRENCY, fetch_kospi_range
+from app.jobs.upsert import bulk_upsert_market_series
+from app.models import MarketClosedDay, SyncWatermark
+from app.registry import REGISTRY, metrics_for_source
 
-KOREAEXIM_API_URL = "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON"
-KOSPI_API_URL = "https://apis.data.go.kr/1160100/service/GetMarketIndexInfoService/getStockMarketIndex"
+SYNC_METRICS = tuple(REGISTRY)
 
+# progress(metric, status, **details); status is running / done / failed / skipped
+Progress = Callable[..., None]
 
-def _resolve_exim_date(today: date) -> date:
-    # Use last weekday (Fri) for weekend to avoid extra calls.
-    if today.weekday() == 5:  # Saturday
-        return today - timedelta(days=1)
-    if today.weekday() == 6:  # Sunday
-        return today - timedelta(days=2)
-    return today
+# How far back to look for gaps when a metric has no watermark yet
+SYNC_INITIAL_LOOKBACK_DAYS = int(os.getenv("SYNC_INITIAL_LOOKBACK_DAYS", "14"))
+# An empty API answer for a weekday older than this is recorded as a closed day
+SYNC_NO_DATA_GRACE_DAYS = int(os.getenv("SYNC_NO_DATA_GRACE_DAYS", "5"))
 
+# Wall-clock budget for all API calls of one run; whatever is still missing then is left for the next run
+SYNC_TIME_BUDGET_SECONDS = float(os.getenv("SYNC_TIME_BUDGET_SECONDS", "40"))
+# Per-request retries (full-jitter exponential backoff) and the per-host circuit breaker
+SYNC_RETRIES = int(os.getenv("SYNC_RETRIES", "2"))
+SYNC_RETRY_BACKOFF_SECONDS = float(os.getenv("SYNC_RETRY_BACKOFF_SECONDS", "0.5"))
+SYNC_BREAKER_FAILURES = int(os.getenv("SYNC_BREAKER_FAILURES", "3"))
+SYNC_BREAKER_RESET_SECONDS = float(os.getenv("SYNC_BREAKER_RESET_SECONDS", "300"))
 
-def _fetch_usdkrw_rate(search_date: date, api_key: str) -> dict | None:
-    params = {
-        "authkey": api_key,
-        "searchdate": search_date.strftime("%Y%m%d"),
-        "data": "AP01",
-    }
+# Weekdays since each metric's watermark that have neither data nor a closed-day entry
+_MISSING_DAYS_SQL = text(
+    """
+    SELECT m.metric, d.day
+    FROM unnest(CAST(:metrics AS varchar[])) AS m(metric)
+    LEFT JOIN sync_watermarks w ON w.metric = m.metric
+    CROSS JOIN LATERAL (
+        SELECT CAST(g AS date) AS day
+        FROM generate_series(
+            COALESCE(w.last_date + 1, CAST(:initial_start AS date)),
+            CAST(:today AS date),
+            interval '1 day'
+        ) AS g
+    ) AS d
+    WHERE extract(isodow FROM d.day) < 6
+      AND NOT EXISTS (
+          SELECT 1 FROM market_series s WHERE s.metric = m.metric AND s.date = d.day
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM market_closed_days c WHERE c.metric = m.metric AND c.date = d.day
+      )
+    ORDER BY m.metric, d.day
+    """
+)
 
-    try:
-        resp = requests.get(KOREAEXIM_API_URL, params=params, timeout=10, verify=False)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as exc:
-        print(f"[sync] EXIM API error: {exc}", flush=True)
-        return None
 
-    if not data:
-        return None
+def _find_missing_days(db: Session, today: date) -> dict[str, list[date]]:
+    rows = db.execute(
+        _MISSING_DAYS_SQL,
+        {
+            "metrics": list(SYNC_METRICS),
+            "initial_start": today - timedelta(days=SYNC_INITIAL_LOOKBACK_DAYS),
+            "today": today,
+        },
+    ).all()
 
-    for item in data:
-        if item.get("cur_unit") == "USD":
-            rate_str = item.get("deal_bas_r", "0").replace(",", "")
-            return {
-                "date": search_date,
-                "value": float(rate_str),
-                "source": "exim",
-            }
+    missing: dict[str, list[date]] = {metric: [] for metric in SYNC_METRICS}
+    for metric, day in rows:
+        missing[metric].append(day)
+    return missing
 
-    return None
 
+def _mark_closed_days(db: Session, metric: str, days: list[date]) -> None:
+    if not days:
+        return
+    stmt = insert(MarketClosedDay).values(
+        [{"metric": metric, "date": day, "reason": "no-data"} for day in days]
+    )
+    db.execute(stmt.on_conflict_do_nothing())
 
-def _fetch_kospi_week(api_key: str) -> list[dict]:
-    """최근 일주일치 KOSPI 데이터를 가져옴 (최대 10건)"""
-    params = {
-        "serviceKey": api_key,
-        "numOfRows": 10,
-        "resultType": "json",
-        "idxNm": "\ucf54\uc2a4\ud53c",
-    }
 
-    try:
-        resp = requests.get(KOSPI_API_URL, params=params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as exc:
-        print(f"[sync] KOSPI API error: {exc}", flush=True)
-        return []
-
-    items = data.get("response", {}).get("body", {}).get("items", {}).get("item", [])
-    if not items:
-        return []
-
-    result = []
-    for item in items:
-        bas_dt = item.get("basDt", "")
-        clpr = item.get("clpr", "0")
-        if not bas_dt or not clpr:
-            continue
-        parsed_date = datetime.strptime(bas_dt, "%Y%m%d").date()
-        result.append({"date": parsed_date, "value": float(clpr), "source": "data.go.kr"})
-
-    return result
-
-
-def _upsert_market_series(db: Session, metric: str, series_date: date, value: float, source: str) -> None:
-    stmt = insert(MarketSeries).values(
-        metric=metric,
-        date=series_date,
-        value=value,
-        source=source,
-    )
+def _save_watermark(db: Session, metric: str, last_date: date) -> None:
+    stmt = insert(SyncWatermark).values(metric=metric, last_date=last_date)
     stmt = stmt.on_conflict_do_update(
-        index_elements=[MarketSeries.metric, MarketSeries.date],
-        set_={
-            "value": value,
-            "source": source,
-            "updated_at": func.now(),
-        },
+        index_elements=[SyncWatermark.metric],
+        set_={"last_date": last_date, "updated_at": func.now()},
     )
     db.execute(stmt)
 
 
-def run_sync(db: Session | None = None) -> dict:
+def _resolve_gaps(
+    db: Session,
+    metric: str,
+    missing: list[date],
+    fetched: set[date],
+    fetch_ok: bool,
+    today: date,
+) -> None:
+    """Record confirmed closed days and advance the metric's watermark."""
+    unresolved = [day for day in missing if day not in fetched]
+
+    if fetch_ok:
+        grace_cutoff = today - timedelta(days=SYNC_NO_DATA_GRACE_DAYS)
+        closed = [day for day in unresolved if day < grace_cutoff]
+        _mark_closed_days(db, metric, closed)
+        unresolved = [day for day in unresolved if day >= grace_cutoff]
+
+    # Everything before the first unresolved day is either stored or ruled out
+    watermark = unresolved[0] - timedelta(days=1) if unresolved else today
+    _save_watermark(db, metric, watermark)
+
+
+def _format_counts(counts: dict) -> str:
+    return f"inserted {counts['inserted']}, updated {counts['updated']}, unchanged {counts['unchanged']}"
+
+
+def _no_progress(metric: str, status: str, **details) -> None:
+    pass
+
+
+def _fetch_kospi(api_key: str, missing: list[date], session) -> tuple[list[dict], str | None]:
+    try:
+        return fetch_kospi_range(api_key, missing[0], missing[-1], strict=True, session=session), None
+    except Exception as exc:
+        print(f"[sync] KOSPI API error: {exc}", flush=True)
+        return [], str(exc)
+
+
+def _store_kospi(
+    db: Session,
+    missing: list[date],
+    records: list[dict],
+    error: str | None,
+    today: date,
+    progress: Progress,
+) -> str:
+    counts = {}
+    if records:
+        counts = bulk_upsert_market_series(
+            db,
+            [("kospi", item["date"], item["value"], item["source"]) for item in records],
+        )
+        saved_dates = [item["date"].isoformat() for item in records]
+        summary = f"{len(saved_dates)} days: {saved_dates[0]}~{saved_dates[-1]} ({_format_counts(counts)})"
+    else:
+        summary = "no-data"
+    _resolve_gaps(db, "kospi", missing, {item["date"] for item in records}, error is None, today)
+    db.commit()
+
+    if error is None:
+        progress("kospi", "done", fetched=len(records), **counts)
+    else:
+        progress("kospi", "failed", error=error)
+    return summary
+
+
+def _store_exim(
+    db: Session,
+    metrics: list[str],
+    missing: dict[str, list[date]],
+    days: list[date],
+    records: list[dict],
+    failed_days: list[date],
+    today: date,
+    progress: Progress,
+) -> str:
+    counts = {}
+    if records:
+        counts = bulk_upsert_market_series(
+            db,
+            [(item["metric"], item["date"], item["value"], item["source"]) for item in records],
+        )
+        saved_dates = sorted({item["date"] for item in records})
+        summary = (
+            f"{len(saved_dates)} days x {len({item['metric'] for item in records})} currencies: "
+            f"{saved_dates[0].isoformat()}~{saved_dates[-1].isoformat()} ({_format_counts(counts)})"
+        )
+    elif days:
+        summary = "no-data"
+    else:
+        summary = "up-to-date"
+    if failed_days:
+        summary += f", {len(failed_days)} day(s) failed"
+
+    fetch_ok = not failed_days
+    for metric in metrics:
+        fetched = {item["date"] for item in records if item["metric"] == metric}
+        _resolve_gaps(db, metric, missing[metric], fetched, fetch_ok, today)
+    db.commit()
+
+    if fetch_ok:
+        progress("exim", "done", fetched=len(records), **counts)
+    else:
+        progress("exim", "failed", fetched=len(records), failedDays=len(failed_days), **counts)
+    return summary
+
+
+def run_sync(db: Session | None = None, progress: Progress | None = None) -> dict:
+    """Fill every missing day since each metric's watermark and refresh the aggregates.
+
+    KOSPI and every missing EXIM day are fetched concurrently over one pooled
+    ``GuardedSession`` (jittered retries, per-host circuit breaker) within
+    ``SYNC_TIME_BUDGET_SECONDS``. Each source is written and committed as
+    soon as its fetch finishes, so a slow or failing source never holds back
+    the other; days it could not fetch stay behind its watermark for the next
+    run.
+
+    ``progress`` is called as ``progress(metric, status, **details)`` whenever
+    a metric starts or finishes, e.g. to report on a background job.
+    """
+    progress = progress or _no_progress
     own_session = False
     if db is None:
         db = SessionLocal()
         own_session = True
 
-    result = {"kospi": "skipped", "usdkrw": "skipped"}
+    result = {"kospi": "skipped", "exim": "skipped"}
+    deadline = Deadline(SYNC_TIME_BUDGET_SECONDS if SYNC_TIME_BUDGET_SECONDS > 0 else None)
+    http = build_guarded_session(
+        deadline,
+        pool_size=max(KOSPI_CONCURRENCY, EXIM_CONCURRENCY),
+        retries=SYNC_RETRIES,
+        backoff=SYNC_RETRY_BACKOFF_SECONDS,
+        failure_threshold=SYNC_BREAKER_FAILURES,
+        reset_seconds=SYNC_BREAKER_RESET_SECONDS,
+    )
     try:
         kospi_key = os.getenv("KOSPI_API_KEY") or os.getenv("DATA_GO_KR_API_KEY") or ""
         exim_key = os.getenv("EXIM_API_KEY") or ""
+        today = date.today()
 
-        # KOSPI: 일주일치 backfill
-        if kospi_key:
-            kospi_list = _fetch_kospi_week(kospi_key)
-            if kospi_list:
-                saved_dates = []
-                for kospi_data in kospi_list:
-                    _upsert_market_series(
-                        db,
-                        "kospi",
-                        kospi_data["date"],
-                        kospi_data["value"],
-                        kospi_data["source"],
-                    )
-                    saved_dates.append(kospi_data["date"].isoformat())
-                result["kospi"] = f"{len(saved_dates)} days: {saved_dates[0]}~{saved_dates[-1]}"
+        # 휴장일 캘린더(market_holidays.csv)를 먼저 반영해 공휴일은 조회하지 않음
+        apply_holidays(db)
+        missing = _find_missing_days(db, today)
+        exim_metrics = [metric.id for metric in metrics_for_source(EXIM_SOURCE)]
+        exim_days = sorted({day for metric in exim_metrics for day in missing[metric]})
+
+        # 두 소스를 동시에 조회하고, 먼저 끝난 쪽부터 저장 / commit
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="sync-fetch") as executor:
+            pending = {}
+
+            # KOSPI: 마지막 watermark 이후 빠진 거래일만 한 번에 조회
+            if not kospi_key:
+                result["kospi"] = "missing-api-key"
+                progress("kospi", "skipped", reason="missing-api-key")
+            elif missing["kospi"]:
+                progress("kospi", "running", missingDays=len(missing["kospi"]))
+                pending[executor.submit(_fetch_kospi, kospi_key, missing["kospi"], http)] = "kospi"
             else:
-                result["kospi"] = "no-data"
-        else:
-            result["kospi"] = "missing-api-key"
-
-        # USD/KRW: 일주일치 backfill
-        if exim_key:
-            today = date.today()
-            saved_dates = []
-            for days_ago in range(7):
-                target_date = today - timedelta(days=days_ago)
-                # 주말은 건너뛰기
-                if target_date.weekday() >= 5:
-                    continue
-                # 이미 존재하면 건너뛰기
-                exists_stmt = select(MarketSeries.id).where(
-                    MarketSeries.metric == "usdkrw", MarketSeries.date == target_date
-                )
-                if db.execute(exists_stmt).first():
-                    continue
-                # API 호출
-                usd_data = _fetch_usdkrw_rate(target_date, exim_key)
-                if usd_data:
-                    _upsert_market_series(
-                        db,
-                        "usdkrw",
-                        usd_data["date"],
-                        usd_data["value"],
-                        usd_data["source"],
-                    )
-                    saved_dates.append(usd_data["date"].isoformat())
-            if saved_dates:
-                result["usdkrw"] = f"{len(saved_dates)} days: {', '.join(saved_dates)}"
+                progress("kospi", "running", missingDays=0)
+                result["kospi"] = "up-to-date"
+                _save_watermark(db, "kospi", today)
+                db.commit()
+                progress("kospi", "done", fetched=0)
+
+            # 환율: 빠진 날짜를 동시에 조회, 한 번의 응답으로 등록된 모든 통화 저장
+            if not exim_key:
+                result["exim"] = "missing-api-key"
+                progress("exim", "skipped", reason="missing-api-key")
             else:
-                result["usdkrw"] = "already-present or no-data"
-        else:
-            result["usdkrw"] = "missing-api-key"
+                progress("exim", "running", missingDays=len(exim_days))
+                future = executor.submit(fetch_exim_days, exim_key, exim_days, http, deadline=deadline)
+                pending[future] = "exim"
+
+            for future in as_completed(pending):
+                if pending[future] == "kospi":
+                    records, error = future.result()
+                    result["kospi"] = _store_kospi(db, missing["kospi"], records, error, today, progress)
+                else:
+                    records, failed_days = future.result()
+                    result["exim"] = _store_exim(
+                        db, exim_metrics, missing, exim_days, records, failed_days, today, progress
+                    )
 
+        # 통계/집계 테이블 갱신
+        refresh_aggregates(db, today)
         db.commit()
         return result
     except Exception:
         db.rollback()
         raise
     finally:
+        http.close()
         if own_session:
             db.close()
 
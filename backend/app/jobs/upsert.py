@@ -0,0 +1,100 @@
+"""Bulk upsert of market_series rows shared by the sync and seed jobs.
+
+Every write also refreshes the ``market_series_aligned`` rows of the dates it
+changed, so the wide table the API reads stays in step without a full rebuild.
+"""
+
+from collections.abc import Iterable, Sequence
+from datetime import date
+
+from sqlalchemy import Float, cast, delete, func, insert as portable_insert, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import MarketSeries, market_series_aligned
+from app.registry import REGISTRY
+
+# 4 bind parameters per row keeps each statement well under driver limits
+CHUNK_SIZE = 1000
+
+Record = tuple[str, date, float, str]
+
+
+def bulk_upsert_market_series(db: Session, records: Iterable[Record], chunk_size: int = CHUNK_SIZE) -> dict:
+    """Write ``(metric, date, value, source)`` records with one statement per chunk.
+
+    Rows whose value and source are unchanged are left alone so ``updated_at``
+    (and with it the API data version) only moves when data actually changes.
+    Returns inserted / updated / unchanged counts.
+    """
+    # Postgres rejects a statement that touches the same row twice; last record wins
+    latest: dict[tuple[str, date], Record] = {}
+    for record in records:
+        latest[(record[0], record[1])] = record
+    rows = [
+        {"metric": metric, "date": series_date, "value": value, "source": source}
+        for metric, series_date, value, source in latest.values()
+    ]
+
+    result = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for offset in range(0, len(rows), chunk_size):
+        chunk = rows[offset : offset + chunk_size]
+        stmt = insert(MarketSeries).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MarketSeries.metric, MarketSeries.date],
+            set_={
+                "value": stmt.excluded.value,
+                "source": stmt.excluded.source,
+                "updated_at": func.now(),
+            },
+            where=or_(
+                MarketSeries.value.is_distinct_from(stmt.excluded.value),
+                MarketSeries.source.is_distinct_from(stmt.excluded.source),
+            ),
+        )
+        # xmax is 0 only for freshly inserted tuples; skipped rows are not returned
+        stmt = stmt.returning(MarketSeries.date, literal_column("(xmax = 0)").label("inserted"))
+
+        written = db.execute(stmt).all()
+        inserted = sum(1 for row in written if row.inserted)
+        result["inserted"] += inserted
+        result["updated"] += len(written) - inserted
+        result["unchanged"] += len(chunk) - len(written)
+
+        refresh_aligned(db, sorted({row.date for row in written}))
+
+    return result
+
+
+def _pivot_select():
+    """market_series as (date, <value per registered metric>...), one row per date."""
+    stmt = select(
+        MarketSeries.date,
+        *(
+            cast(func.max(MarketSeries.value).filter(MarketSeries.metric == metric), Float).label(metric)
+            for metric in REGISTRY
+        ),
+    )
+    # The metric filter lets the (metric, date) index serve the date lookups
+    return stmt.where(MarketSeries.metric.in_(list(REGISTRY))).group_by(MarketSeries.date)
+
+
+def refresh_aligned(db: Session, dates: Sequence[date]) -> None:
+    """Re-pivot the market_series_aligned rows of ``dates``; rows that come out the same are left alone."""
+    if not dates:
+        return
+    table = market_series_aligned
+    metrics = list(REGISTRY)
+    stmt = insert(table).from_select(["date", *metrics], _pivot_select().where(MarketSeries.date.in_(dates)))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date],
+        set_={metric: stmt.excluded[metric] for metric in metrics},
+        where=or_(*(table.c[metric].is_distinct_from(stmt.excluded[metric]) for metric in metrics)),
+    )
+    db.execute(stmt)
+
+
+def rebuild_aligned(db: Session) -> None:
+    """Rebuild market_series_aligned from scratch, for rows written outside ``bulk_upsert_market_series``."""
+    db.execute(delete(market_series_aligned))
+    db.execute(portable_insert(market_series_aligned).from_select(["date", *REGISTRY], _pivot_select()))
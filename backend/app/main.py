@@ -1,16 +1,28 @@
 ﻿import logging
 import os
 import sys
+import asyncio
 import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
 from typing import Optional
 
-from fastapi import Depends, FastAPI, HTTPException, Request, Response
+import orjson
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
 
-from app.data_service import calculate_stats, get_series_from_db
-from app.db import SessionLocal
-from app.jobs.sync_daily import run_sync
+from app.data_service import ALL_METRICS, METRICS, PERIOD_DAYS, get_data_version, resolve_range
+from app import analytics, compression, export, http_cache, telemetry
+from app.registry import REGISTRY
+from app.db import AsyncSessionLocal, SessionLocal, open_async_pool_connections, open_pool_connections
+from app.jobs import runner
+from app.series_cache import RESOLUTION_KEYS, series_cache
+from app.telemetry import TelemetryMiddleware
+from app.compression import CompressionMiddleware
 
 # Log to stdout
 logging.basicConfig(
@@ -24,38 +36,80 @@ logger = logging.getLogger(__name__)
 # Ensure line-buffered stdout
 sys.stdout.reconfigure(line_buffering=True)
 
-app = FastAPI()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+RESOLUTIONS = ("daily", *RESOLUTION_KEYS)
+# LTTB needs the two end points plus at least one bucket
+MIN_POINTS = 3
+MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS_LIMIT", "5000"))
 
+# Upper bound of the backoff between warm-up attempts while the database is unreachable
+WARM_UP_RETRY_MAX_SECONDS = float(os.getenv("WARM_UP_RETRY_MAX_SECONDS", "30"))
 
-def get_db() -> Session:
+# Set once the series cache loaded at startup; /ready reports it to the load balancer
+_ready = asyncio.Event()
+
+
+def _load_series_cache() -> None:
     db = SessionLocal()
     try:
-        yield db
+        series_cache.load(db)
     finally:
         db.close()
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
+async def _warm_up() -> None:
+    """Open the pool, load the series cache and encode every preset period.
 
-    query = str(request.query_params) if request.query_params else ""
-    print(f">> Request: {request.method} {request.url.path} {query}", flush=True)
+    The load is retried with exponential backoff until it succeeds; /ready
+    stays 503 until then, so no traffic is routed to an instance that cannot
+    serve. Failing to pre-encode the preset bodies does not hold it back.
+    """
+    started = time.perf_counter()
+    delay = 1.0
+    while True:
+        try:
+            if AsyncSessionLocal is not None:
+                opened = await open_async_pool_connections()
+            else:
+                opened = await run_in_threadpool(open_pool_connections)
+            await run_in_threadpool(_load_series_cache)
+            break
+        except Exception as exc:
+            logger.warning("Startup warm-up failed, retrying in %.0fs: %s", delay, exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_UP_RETRY_MAX_SECONDS)
+
+    try:
+        warmed = await run_in_threadpool(series_cache.warm, _preset_bodies(), compression.ENCODINGS)
+    except Exception as exc:
+        # Requests still work; they just pay for encoding the presets themselves
+        logger.warning("Preset warm-up failed: %s", exc)
+        warmed = 0
+    duration = round((time.perf_counter() - started) * 1000, 2)
+    logger.info("Warm-up done: %d connections, %d bodies (%sms)", opened, warmed, duration)
+    _ready.set()
 
-    response = await call_next(request)
 
-    duration = round((time.time() - start_time) * 1000, 2)
-    print(f"<< Response: {response.status_code} ({duration}ms)", flush=True)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /health answers while connections open
+    warm_up = asyncio.create_task(_warm_up())
+    yield
+    warm_up.cancel()
 
-    return response
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=False,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(CompressionMiddleware)
+# Outermost, so the timings cover compression, CORS and everything below it
+app.add_middleware(TelemetryMiddleware)
 
 
 @app.get("/")
@@ -69,43 +123,419 @@ def health_head():
     return Response(status_code=200)
 
 
+@app.get("/metrics")
+def metrics_endpoint():
+    content, media_type = telemetry.metrics_response()
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/api/metrics")
+def list_metrics():
+    """Registered metrics; any of them can be passed to the series endpoints."""
+    return {"default": list(METRICS), "metrics": [REGISTRY[metric].to_dict() for metric in ALL_METRICS]}
+
+
+@app.get("/ready")
+def ready():
+    """503 until the startup warm-up loaded the series cache; /health only says the process is up."""
+    if not _ready.is_set():
+        return Response(
+            content=orjson.dumps({"status": "warming"}), status_code=503, media_type="application/json"
+        )
+    return {"status": "ready", "dataVersion": series_cache.version}
+
+
+_cache_refresh_lock = asyncio.Lock()
+
+
+def _ensure_cache_fresh_sync(data_version=None) -> None:
+    db = SessionLocal()
+    try:
+        series_cache.ensure_fresh(db, data_version)
+    finally:
+        db.close()
+
+
+async def _refresh_series_cache() -> None:
+    """Version-check the series cache; reads only touch the database when a check is due."""
+    if not series_cache.check_due():
+        return
+    # One refresh at a time; the cache's thread lock must never block the event loop
+    async with _cache_refresh_lock:
+        if not series_cache.check_due():
+            return
+        data_version = None
+        if AsyncSessionLocal is not None:
+            # Only the cheap version probe runs on the loop; run_sync would also keep a reload there
+            try:
+                async with AsyncSessionLocal() as db:
+                    data_version = await db.run_sync(get_data_version)
+            except SQLAlchemyError as exc:
+                if series_cache.version is None:
+                    raise
+                series_cache.mark_stale(exc)
+                return
+        # A reload (wide-table fetch, NumPy build) goes through the sync engine in the threadpool
+        await run_in_threadpool(_ensure_cache_fresh_sync, data_version)
+
+
+def _parse_date_param(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        # Same format resolve_range parses
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected YYYY-MM-DD")
+
+
+def _resolve_query_range(period: str, startDate: Optional[str], endDate: Optional[str]):
+    _parse_date_param(startDate, "startDate")
+    _parse_date_param(endDate, "endDate")
+    if startDate and endDate:
+        return resolve_range("custom", startDate, endDate)
+    if period not in PERIOD_DAYS:
+        raise HTTPException(status_code=400, detail="Unsupported period")
+    return resolve_range(period)
+
+
+def _parse_metrics(metrics: str) -> list[str]:
+    metric_list = list(dict.fromkeys(m.strip() for m in metrics.split(",") if m.strip()))
+    if not metric_list or any(metric not in REGISTRY for metric in metric_list):
+        raise HTTPException(status_code=400, detail="Unsupported metric")
+    return metric_list
+
+
+def _stats_period(period: str, startDate: Optional[str], endDate: Optional[str]) -> Optional[str]:
+    # Preset periods can use the stats precomputed at sync time
+    return None if startDate and endDate else period
+
+
+def _encode(payload: dict) -> bytes:
+    # orjson handles NumPy arrays directly, no jsonable_encoder pass
+    return telemetry.timed_encode(lambda: orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY))
+
+
+def _json_response(payload: dict, headers: dict[str, str] | None = None) -> Response:
+    return Response(content=_encode(payload), media_type="application/json", headers=headers)
+
+
+def _body_key(key: tuple) -> tuple:
+    # Relative periods move with the calendar, so today is part of every key
+    return (date.today().isoformat(), *key)
+
+
+async def _cached_json_response(request: Request, key: tuple, build, headers: dict[str, str]) -> Response:
+    """Serve the body memoized for ``key`` in the series cache, encoding it on a miss.
+
+    The compressed copy is cached too; the compression middleware passes it through.
+    Hits are served on the event loop; a miss (slicing, LTTB, encoding,
+    compression) runs in the threadpool so it never stalls other requests.
+    """
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    body_key = _body_key(key)
+    cached = series_cache.peek_body(body_key, encoding)
+    if cached is None:
+        cached = await run_in_threadpool(series_cache.get_body, body_key, lambda: _encode(build()), encoding)
+    body, encoding = cached
+    headers = dict(headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _check_format(format: str, dateFormat: str) -> None:
+    if format not in {"rows", "columnar"}:
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    if dateFormat not in {"iso", "epoch"}:
+        raise HTTPException(status_code=400, detail="Unsupported dateFormat")
+
+
+def _check_sampling(resolution: str, maxPoints: Optional[int], metric_count: int = 1) -> None:
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="Unsupported resolution")
+    # LTTB needs 3 points per series, and a batch splits maxPoints between its metrics
+    min_points = MIN_POINTS * metric_count
+    if maxPoints is not None and not min_points <= maxPoints <= MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"maxPoints must be between {min_points} and {MAX_POINTS}")
+
+
+def _is_sampled(resolution: str, maxPoints: Optional[int]) -> bool:
+    return resolution != "daily" or maxPoints is not None
+
+
+def _sampling_info(resolution: str, maxPoints: Optional[int], source_points: int) -> dict:
+    return {"resolution": resolution, "maxPoints": maxPoints, "sourcePoints": source_points}
+
+
+def _cache_validators(request: Request) -> tuple[str, dict[str, str]]:
+    """ETag plus the headers shared by the 200 and the 304 (RFC 9110 requires the 304 to repeat Vary)."""
+    etag = http_cache.build_etag(
+        series_cache.version,
+        date.today().isoformat(),
+        request.url.path,
+        str(request.query_params),
+    )
+    return etag, {**http_cache.cache_headers(etag, series_cache.last_modified), "Vary": "Accept-Encoding"}
+
+
+def _series_payload(
+    metric: str,
+    period: str,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    format: str = "rows",
+    dateFormat: str = "iso",
+    resolution: str = "daily",
+    maxPoints: Optional[int] = None,
+) -> dict:
+    query_start, query_end = _resolve_query_range(period, startDate, endDate)
+    payload = {
+        "metric": metric,
+        "period": period,
+        "startDate": startDate,
+        "endDate": endDate,
+    }
+    if _is_sampled(resolution, maxPoints):
+        # Rows are always ISO-dated, as in the unsampled response
+        epoch_days = format == "columnar" and dateFormat == "epoch"
+        dates, columns, ohlc, source_points = series_cache.get_resampled(
+            [metric], query_start, query_end, resolution, maxPoints, epoch_days
+        )
+        if format == "columnar":
+            payload.update({"format": format, "dates": dates, "values": columns[metric]})
+            if ohlc is not None:
+                payload["ohlc"] = ohlc[metric]
+        else:
+            payload["series"] = [{"date": d, "value": v} for d, v in zip(dates, columns[metric].tolist())]
+            if ohlc is not None:
+                for row, opened, high, low in zip(
+                    payload["series"], *(ohlc[metric][key].tolist() for key in ("open", "high", "low"))
+                ):
+                    row.update({"open": opened, "high": high, "low": low})
+        payload["sampling"] = _sampling_info(resolution, maxPoints, source_points)
+    elif format == "columnar":
+        dates, columns = series_cache.get_columns([metric], query_start, query_end, dateFormat == "epoch")
+        payload.update({"format": format, "dates": dates, "values": columns[metric]})
+    else:
+        payload["series"] = series_cache.get_series(metric, query_start, query_end)
+    # Stats always cover the full-resolution slice
+    payload["stats"] = series_cache.get_stats(
+        metric, query_start, query_end, _stats_period(period, startDate, endDate)
+    )
+    return payload
+
+
+def _batch_payload(
+    metric_list: list[str],
+    period: str,
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    dateFormat: str = "iso",
+    resolution: str = "daily",
+    maxPoints: Optional[int] = None,
+) -> dict:
+    query_start, query_end = _resolve_query_range(period, startDate, endDate)
+    payload = {
+        "metrics": metric_list,
+        "period": period,
+        "startDate": startDate,
+        "endDate": endDate,
+    }
+    if _is_sampled(resolution, maxPoints):
+        dates, columns, ohlc, source_points = series_cache.get_resampled(
+            metric_list, query_start, query_end, resolution, maxPoints, dateFormat == "epoch"
+        )
+        payload.update({"dates": dates, "values": columns})
+        if ohlc is not None:
+            payload["ohlc"] = ohlc
+        payload["sampling"] = _sampling_info(resolution, maxPoints, source_points)
+    else:
+        dates, columns = series_cache.get_columns(metric_list, query_start, query_end, dateFormat == "epoch")
+        payload.update({"dates": dates, "values": columns})
+    stats_period = _stats_period(period, startDate, endDate)
+    payload["stats"] = {
+        metric: series_cache.get_stats(metric, query_start, query_end, stats_period, metric_list)
+        for metric in metric_list
+    }
+    return payload
+
+
+def _preset_bodies():
+    """``(key, build)`` pairs for what the dashboard requests for each preset period."""
+    for period in PERIOD_DAYS:
+        yield (
+            _body_key(("batch", METRICS, period, None, None, "iso", "daily", None)),
+            lambda period=period: _encode(_batch_payload(list(METRICS), period)),
+        )
+        for metric in METRICS:
+            yield (
+                _body_key(("series", metric, period, None, None, "rows", "iso", "daily", None)),
+                lambda metric=metric, period=period: _encode(_series_payload(metric, period)),
+            )
+
+
 @app.get("/api/series")
-def series(
+async def series(
+    request: Request,
     metric: str = "kospi",
     period: str = "1m",
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
-    db: Session = Depends(get_db),
+    format: str = "rows",
+    dateFormat: str = "iso",
+    resolution: str = "daily",
+    maxPoints: Optional[int] = None,
 ):
-    if metric not in {"kospi", "usdkrw"}:
+    if metric not in REGISTRY:
         raise HTTPException(status_code=400, detail="Unsupported metric")
+    _check_format(format, dateFormat)
+    _check_sampling(resolution, maxPoints)
 
-    if startDate and endDate:
-        series_data = get_series_from_db(db, metric, "custom", startDate, endDate)
-    else:
-        if period not in {"1d", "1w", "1m", "3m", "1y"}:
-            raise HTTPException(status_code=400, detail="Unsupported period")
-        series_data = get_series_from_db(db, metric, period)
+    query_start, query_end = _resolve_query_range(period, startDate, endDate)
+
+    await _refresh_series_cache()
+    etag, headers = _cache_validators(request)
+    if http_cache.is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return await _cached_json_response(
+        request,
+        ("series", metric, period, startDate, endDate, format, dateFormat, resolution, maxPoints),
+        lambda: _series_payload(metric, period, startDate, endDate, format, dateFormat, resolution, maxPoints),
+        headers,
+    )
 
-    stats = calculate_stats(series_data)
 
+@app.get("/api/series/batch")
+async def series_batch(
+    request: Request,
+    metrics: str = ",".join(METRICS),
+    period: str = "1m",
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    dateFormat: str = "iso",
+    resolution: str = "daily",
+    maxPoints: Optional[int] = None,
+):
+    metric_list = _parse_metrics(metrics)
+    _check_format("columnar", dateFormat)
+    _check_sampling(resolution, maxPoints, len(metric_list))
+    _resolve_query_range(period, startDate, endDate)
+
+    await _refresh_series_cache()
+    etag, headers = _cache_validators(request)
+    if http_cache.is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return await _cached_json_response(
+        request,
+        ("batch", tuple(metric_list), period, startDate, endDate, dateFormat, resolution, maxPoints),
+        lambda: _batch_payload(metric_list, period, startDate, endDate, dateFormat, resolution, maxPoints),
+        headers,
+    )
+
+
+@app.get("/api/analytics")
+async def analytics_report(
+    request: Request,
+    metrics: str = ",".join(METRICS),
+    period: str = "1y",
+    startDate: Optional[str] = None,
+    endDate: Optional[str] = None,
+    window: int = 20,
+):
+    metric_list = _parse_metrics(metrics)
+    if not 2 <= window <= 260:
+        raise HTTPException(status_code=400, detail="window must be between 2 and 260")
+
+    query_start, query_end = _resolve_query_range(period, startDate, endDate)
+
+    await _refresh_series_cache()
+    etag, headers = _cache_validators(request)
+    if http_cache.is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    def build() -> dict:
+        dates, columns = series_cache.get_columns(metric_list, query_start, query_end)
+        return {
+            "metrics": metric_list,
+            "period": period,
+            "startDate": startDate,
+            "endDate": endDate,
+            "window": window,
+            "dates": dates,
+            **analytics.analyze(columns, window),
+        }
+
+    # Rolling windows over a long range are real CPU work; memoize and build off the loop
+    return await _cached_json_response(
+        request, ("analytics", tuple(metric_list), period, startDate, endDate, window), build, headers
+    )
+
+
+@app.get("/api/stats")
+async def period_stats(period: str = "1m"):
+    """Stats precomputed at sync time: period stats, volatility, drawdown, correlation."""
+    if period not in PERIOD_DAYS:
+        raise HTTPException(status_code=400, detail="Unsupported period")
+
+    await _refresh_series_cache()
+    today = date.today()
     return {
-        "metric": metric,
         "period": period,
-        "startDate": startDate,
-        "endDate": endDate,
-        "series": series_data,
-        "stats": stats,
+        "asOf": today.isoformat(),
+        "stats": {metric: series_cache.get_period_stats(metric, period, today) for metric in METRICS},
+        "latest": series_cache.get_latest_rolling(),
     }
 
 
-@app.post("/admin/sync")
-def admin_sync(token: str, db: Session = Depends(get_db)):
+@app.get("/api/export")
+def export_series(
+    metrics: str = ",".join(METRICS),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    format: str = "ndjson",
+):
+    """Stream every aligned row in [start, end] (whole history by default) as NDJSON or CSV."""
+    metric_list = _parse_metrics(metrics)
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    start_date = _parse_date_param(start, "start")
+    end_date = _parse_date_param(end, "end")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    filename = "-".join(("market", *metric_list, start or "all", end or date.today().isoformat()))
+    return StreamingResponse(
+        export.stream_export(metric_list, start_date, end_date, format),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
+def _check_admin_token(token: str) -> None:
     expected = os.getenv("ADMIN_SYNC_TOKEN", "")
     if not expected:
         raise HTTPException(status_code=500, detail="ADMIN_SYNC_TOKEN is not set")
     if token != expected:
         raise HTTPException(status_code=403, detail="Invalid token")
 
-    result = run_sync(db)
-    return {"status": "ok", "result": result}
+
+@app.post("/admin/sync", status_code=202)
+def admin_sync(token: str):
+    """Queue a sync in the background; poll ``/admin/sync/{job_id}`` for its progress."""
+    _check_admin_token(token)
+
+    job = runner.submit_sync(on_success=series_cache.invalidate)
+    return {"status": job.status, "jobId": job.id, "statusUrl": f"/admin/sync/{job.id}"}
+
+
+@app.get("/admin/sync/{job_id}")
+def admin_sync_status(job_id: str, token: str):
+    _check_admin_token(token)
+
+    job = runner.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown sync job")
+    return job.to_dict()
@@ -1,7 +1,9 @@
 ﻿from datetime import datetime
-from sqlalchemy import Date, DateTime, Integer, Numeric, String, UniqueConstraint, func
+from sqlalchemy import Column, Date, DateTime, Float, Index, Integer, Numeric, String, Table, UniqueConstraint, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from app.registry import REGISTRY
+
 
 class Base(DeclarativeBase):
     pass
@@ -9,7 +11,16 @@ class Base(DeclarativeBase):
 
 class MarketSeries(Base):
     __tablename__ = "market_series"
-    __table_args__ = (UniqueConstraint("metric", "date", name="uq_market_series_metric_date"),)
+    __table_args__ = (
+        UniqueConstraint("metric", "date", name="uq_market_series_metric_date"),
+        # Covering index so aligned series reads are index-only scans
+        Index(
+            "ix_market_series_metric_date_value",
+            "metric",
+            "date",
+            postgresql_include=["value"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     metric: Mapped[str] = mapped_column(String(20), nullable=False)
@@ -22,3 +33,77 @@ class MarketSeries(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
+
+
+# market_series pivoted to one row per date and one nullable column per registered
+# metric, kept in step by bulk_upsert_market_series. Registering a metric needs a
+# migration adding its column.
+market_series_aligned = Table(
+    "market_series_aligned",
+    Base.metadata,
+    Column("date", Date, primary_key=True),
+    *(Column(metric, Float) for metric in REGISTRY),
+)
+
+
+class MarketClosedDay(Base):
+    """Weekday on which a metric has no data (exchange holiday or confirmed empty API response)."""
+
+    __tablename__ = "market_closed_days"
+
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    reason: Mapped[str] = mapped_column(String(50), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class SyncWatermark(Base):
+    """Per-metric date up to which every trading day has been synced or ruled out."""
+
+    __tablename__ = "sync_watermarks"
+
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    last_date: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class MarketSeriesAggregate(Base):
+    """Rolling values of each metric on the latest aligned date, rebuilt at the end of each sync."""
+
+    __tablename__ = "market_series_aggregates"
+
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    ma_20: Mapped[float | None] = mapped_column(Float)
+    ma_60: Mapped[float | None] = mapped_column(Float)
+    volatility_20: Mapped[float | None] = mapped_column(Float)
+    drawdown: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class MarketPeriodStats(Base):
+    """Stats of each preset period window as served by /api/series on ``as_of``."""
+
+    __tablename__ = "market_period_stats"
+
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    period: Mapped[str] = mapped_column(String(10), primary_key=True)
+    as_of: Mapped[datetime.date] = mapped_column(Date, nullable=False)
+    start_date: Mapped[datetime.date] = mapped_column(Date, nullable=True)
+    end_date: Mapped[datetime.date] = mapped_column(Date, nullable=True)
+    points: Mapped[int] = mapped_column(Integer, nullable=False)
+    min: Mapped[float | None] = mapped_column(Float)
+    max: Mapped[float | None] = mapped_column(Float)
+    avg: Mapped[float | None] = mapped_column(Float)
+    change: Mapped[float | None] = mapped_column(Float)
+    change_pct: Mapped[float | None] = mapped_column(Float)
+    volatility: Mapped[float | None] = mapped_column(Float)
+    max_drawdown: Mapped[float | None] = mapped_column(Float)
+    correlation: Mapped[float | None] = mapped_column(Float)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,76 @@
+"""Registry of the market series the app ingests and serves.
+
+Each metric names the source adapter that fetches it (``kospi`` for the
+data.go.kr index API, ``exim`` for the Korea Eximbank exchange-rate API), the
+code identifying it in that source's response, the parser turning a response
+item into a value and the unit shown next to it. The EXIM ``exchangeJSON``
+response carries every currency for a date, so all ``exim`` metrics are
+ingested from one request per day.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+def _parse_number(raw: str | None) -> float | None:
+    if not raw:
+        return None
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def parse_kospi_item(item: dict) -> float | None:
+    return _parse_number(item.get("clpr"))
+
+
+def parse_exim_item(item: dict) -> float | None:
+    # deal_bas_r is the base rate, formatted like "1,384.5"
+    return _parse_number(item.get("deal_bas_r"))
+
+
+@dataclass(frozen=True)
+class Metric:
+    id: str
+    source: str
+    code: str
+    label: str
+    unit: str
+    parser: Callable[[dict], float | None]
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "source": self.source, "label": self.label, "unit": self.unit}
+
+
+def _exim(metric_id: str, code: str, label: str, unit: str = "KRW") -> Metric:
+    return Metric(metric_id, "exim", code, label, unit, parse_exim_item)
+
+
+REGISTRY: dict[str, Metric] = {
+    metric.id: metric
+    for metric in (
+        Metric("kospi", "kospi", "코스피", "KOSPI", "pt", parse_kospi_item),
+        _exim("usdkrw", "USD", "USD/KRW"),
+        _exim("eurkrw", "EUR", "EUR/KRW"),
+        # EXIM quotes JPY and IDR per 100 units
+        _exim("jpykrw", "JPY(100)", "JPY(100)/KRW", "KRW per 100 JPY"),
+        _exim("cnhkrw", "CNH", "CNH/KRW"),
+        _exim("gbpkrw", "GBP", "GBP/KRW"),
+        _exim("chfkrw", "CHF", "CHF/KRW"),
+        _exim("cadkrw", "CAD", "CAD/KRW"),
+        _exim("audkrw", "AUD", "AUD/KRW"),
+        _exim("nzdkrw", "NZD", "NZD/KRW"),
+        _exim("hkdkrw", "HKD", "HKD/KRW"),
+        _exim("sgdkrw", "SGD", "SGD/KRW"),
+        _exim("sekkrw", "SEK", "SEK/KRW"),
+        _exim("thbkrw", "THB", "THB/KRW"),
+    )
+}
+
+# Metrics the dashboard shows side by side; every served date has a value for all of them
+DEFAULT_METRICS: tuple[str, ...] = ("kospi", "usdkrw")
+
+
+def metrics_for_source(source: str) -> list[Metric]:
+    return [metric for metric in REGISTRY.values() if metric.source == source]
@@ -0,0 +1,437 @@
+"""In-process cache of the aligned market series.
+
+Every registered metric (a few hundred rows per year each) is loaded from
+``market_series_aligned`` and held in memory as contiguous NumPy arrays of
+date ordinals and float values, NaN where a metric has no row. A request is
+served from the dates its alignment group (the default metrics plus any other
+requested ones) all have values on; the default group is built at load time,
+others on first use. Every period or custom range is answered by slicing those
+arrays. Market data only changes when a sync commits, so the cache is
+invalidated explicitly after ``/admin/sync`` and otherwise re-checks the data
+version at most every ``SERIES_CACHE_CHECK_SECONDS`` to pick up rows written
+by the cron job in another process.
+
+Encoded response bodies are memoized per data version (``get_body``), so a
+preset period is serialized once per sync instead of once per request; the app
+fills them for every preset at startup (see ``warm``). gzip / brotli copies
+are kept beside the raw bytes, so each body is compressed once per version.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import analytics, compression
+from app.aggregates import load_latest_rolling, load_period_stats
+from app.data_service import (
+    METRICS,
+    aligned_slice,
+    alignment_group,
+    calculate_value_stats,
+    get_data_version,
+    get_wide_table,
+)
+from app.telemetry import record_cache
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL_SECONDS = float(os.getenv("SERIES_CACHE_CHECK_SECONDS", "60"))
+# Custom ranges make the key space unbounded; keep the most recent bodies only
+MAX_BODIES = int(os.getenv("SERIES_CACHE_MAX_BODIES", "256"))
+# Alignment groups kept besides the default one
+MAX_GROUPS = 32
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _month_keys(ordinals: np.ndarray) -> np.ndarray:
+    days = (ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+# Bucket id per date ordinal; ordinal 1 (0001-01-01) is a Monday, so weeks run Mon-Sun
+RESOLUTION_KEYS: dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "weekly": lambda ordinals: (ordinals - 1) // 7,
+    "monthly": _month_keys,
+}
+
+
+@dataclass(frozen=True)
+class _Aligned:
+    """Dates on which every metric of a group has a value, and those values."""
+
+    ordinals: np.ndarray
+    values: dict[str, np.ndarray]
+    iso_dates: list[str]
+    # Pre-encoded per-row output so requests only slice lists, filled per metric on first use
+    rows: dict[str, list[dict]] = field(default_factory=dict)
+
+    def get_rows(self, metric: str) -> list[dict]:
+        rows = self.rows.get(metric)
+        if rows is None:
+            # Racing threads build identical lists
+            rows = self.rows[metric] = [
+                {"date": d, "value": v} for d, v in zip(self.iso_dates, self.values[metric].tolist())
+            ]
+        return rows
+
+
+def _align(ordinals: np.ndarray, values: dict[str, np.ndarray], group: tuple[str, ...]) -> _Aligned:
+    present = np.logical_and.reduce([~np.isnan(values[metric]) for metric in group])
+    index = np.flatnonzero(present)
+    aligned_ordinals = ordinals[index]
+    aligned_values = {metric: values[metric][index] for metric in group}
+    # Readers get views into these arrays; make sure none of them writes
+    for column in (aligned_ordinals, *aligned_values.values()):
+        column.flags.writeable = False
+    iso_dates = [date.fromordinal(ordinal).isoformat() for ordinal in aligned_ordinals.tolist()]
+    return _Aligned(aligned_ordinals, aligned_values, iso_dates)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    version: str
+    last_modified: datetime | None = None
+    # Every date any registered metric has a row on; NaN marks a missing value
+    ordinals: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    values: dict[str, np.ndarray] = field(default_factory=dict)
+    groups: dict[tuple[str, ...], _Aligned] = field(default_factory=dict)
+    # Precomputed by refresh_aggregates at sync time
+    period_stats: dict[tuple[str, str], dict] = field(default_factory=dict)
+    stats_as_of: date | None = None
+    latest_rolling: dict[str, dict] = field(default_factory=dict)
+
+
+class SeriesCache:
+    def __init__(self, check_interval: float = CHECK_INTERVAL_SECONDS, max_bodies: int = MAX_BODIES) -> None:
+        self.check_interval = check_interval
+        self.max_bodies = max_bodies
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        # Raw body under None, compressed copies under their encoding
+        self._bodies: OrderedDict[tuple, dict[str | None, bytes]] = OrderedDict()
+        self._bodies_lock = threading.Lock()
+        self._groups_lock = threading.Lock()
+
+    @property
+    def version(self) -> str | None:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    @property
+    def last_modified(self) -> datetime | None:
+        snapshot = self._snapshot
+        return snapshot.last_modified if snapshot else None
+
+    def invalidate(self) -> None:
+        """Force a version check on the next read."""
+        self._checked_at = 0.0
+
+    def load(self, db: Session, data_version: tuple[str, datetime | None] | None = None) -> None:
+        if data_version is None:
+            data_version = get_data_version(db)
+        version, last_modified = data_version
+
+        dates, wide = get_wide_table(db)
+        ordinals = np.fromiter((day.toordinal() for day in dates), dtype=np.int64, count=len(dates))
+        # None (no row) becomes NaN
+        values = {metric: np.array(column, dtype=np.float64) for metric, column in wide.items()}
+        default = _align(ordinals, values, METRICS)
+        for metric in METRICS:
+            default.get_rows(metric)
+
+        period_stats = {}
+        stats_as_of = None
+        for row in load_period_stats(db):
+            stats_as_of = row.as_of
+            period_stats[(row.metric, row.period)] = {
+                "stats": {
+                    "min": row.min,
+                    "max": row.max,
+                    "avg": row.avg,
+                    "change": row.change,
+                    "changePct": row.change_pct,
+                }
+                if row.points
+                else {},
+                "startDate": row.start_date.isoformat() if row.start_date else None,
+                "endDate": row.end_date.isoformat() if row.end_date else None,
+                "points": row.points,
+                "volatility": row.volatility,
+                "maxDrawdown": row.max_drawdown,
+                "correlation": row.correlation,
+            }
+
+        self._snapshot = _Snapshot(
+            version=version,
+            last_modified=last_modified,
+            ordinals=ordinals,
+            values=values,
+            groups={METRICS: default},
+            period_stats=period_stats,
+            stats_as_of=stats_as_of,
+            latest_rolling=load_latest_rolling(db),
+        )
+        with self._bodies_lock:
+            self._bodies.clear()
+        self._checked_at = time.monotonic()
+
+    def check_due(self) -> bool:
+        """True when the next read should compare the data version with the database."""
+        return self._snapshot is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def mark_stale(self, exc: Exception) -> None:
+        """Keep serving the current snapshot after a failed check; retry after the next interval."""
+        logger.warning("Series cache check failed, serving version %s: %s", self.version, exc)
+        record_cache("snapshot", "stale")
+        self._checked_at = time.monotonic()
+
+    def ensure_fresh(self, db: Session, data_version: tuple[str, datetime | None] | None = None) -> None:
+        """Reload from the database if the data version moved since the last check.
+
+        ``data_version`` skips the probe when the caller already ran it (e.g.
+        on the async engine). Database errors only propagate on a cold cache;
+        with a snapshot in memory they are logged and the snapshot keeps
+        being served.
+        """
+        if not self.check_due():
+            return
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not self.check_due():
+                return
+            try:
+                if data_version is None:
+                    data_version = get_data_version(db)
+                if self._snapshot is not None and self._snapshot.version == data_version[0]:
+                    self._checked_at = time.monotonic()
+                    record_cache("snapshot", "current")
+                    return
+                self.load(db, data_version)
+            except SQLAlchemyError as exc:
+                if self._snapshot is None:
+                    raise
+                self.mark_stale(exc)
+                return
+            record_cache("snapshot", "reloaded")
+
+    def _aligned(self, snapshot: _Snapshot, metrics: Sequence[str]) -> _Aligned:
+        group = alignment_group(metrics)
+        aligned = snapshot.groups.get(group)
+        if aligned is None:
+            aligned = _align(snapshot.ordinals, snapshot.values, group)
+            with self._groups_lock:
+                snapshot.groups[group] = aligned
+                while len(snapshot.groups) > MAX_GROUPS + 1:
+                    del snapshot.groups[next(key for key in snapshot.groups if key != METRICS)]
+        return aligned
+
+    def get_series(self, metric: str, query_start: date, query_end: date) -> list[dict]:
+        """Row-format slice; the dicts are shared between requests and must not be mutated."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+
+        aligned = self._aligned(snapshot, [metric])
+        lo, hi = aligned_slice(aligned.ordinals, query_start, query_end)
+        return aligned.get_rows(metric)[lo:hi]
+
+    def get_columns(
+        self, metrics: list[str], query_start: date, query_end: date, epoch_days: bool = False
+    ) -> tuple[list[str] | np.ndarray, dict[str, np.ndarray]]:
+        """Return the shared date column and one value column per metric.
+
+        Dates are ISO strings, or days since 1970-01-01 when ``epoch_days`` is set.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            empty = np.empty(0, dtype=np.float64)
+            return [], {metric: empty for metric in metrics}
+
+        aligned = self._aligned(snapshot, metrics)
+        lo, hi = aligned_slice(aligned.ordinals, query_start, query_end)
+        dates = aligned.ordinals[lo:hi] - EPOCH_ORDINAL if epoch_days else aligned.iso_dates[lo:hi]
+        return dates, {metric: aligned.values[metric][lo:hi] for metric in metrics}
+
+    def get_resampled(
+        self,
+        metrics: list[str],
+        query_start: date,
+        query_end: date,
+        resolution: str = "daily",
+        max_points: int | None = None,
+        epoch_days: bool = False,
+    ) -> tuple[list[str] | np.ndarray, dict[str, np.ndarray], dict[str, dict[str, np.ndarray]] | None, int]:
+        """Downsampled ``get_columns``: returns dates, values, OHLC and the full-resolution point count.
+
+        ``resolution`` "weekly" / "monthly" collapses each calendar bucket to its
+        last trading day (value = close) and returns open / high / low per
+        metric. ``max_points`` then thins the result with LTTB; for several
+        metrics each picks an equal share and the union is kept, so the dates
+        stay shared and the total stays within ``max_points``. It must allow
+        at least 3 points per metric (checked by the endpoints).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            empty = np.empty(0, dtype=np.float64)
+            return [], {metric: empty for metric in metrics}, None, 0
+
+        aligned = self._aligned(snapshot, metrics)
+        lo, hi = aligned_slice(aligned.ordinals, query_start, query_end)
+        index = np.arange(lo, hi)
+        ordinals = aligned.ordinals[lo:hi]
+        columns = {metric: aligned.values[metric][lo:hi] for metric in metrics}
+        ohlc = None
+
+        if resolution in RESOLUTION_KEYS:
+            starts = analytics.bucket_starts(RESOLUTION_KEYS[resolution](ordinals))
+            ohlc = {metric: analytics.ohlc(column, starts) for metric, column in columns.items()}
+            closes = np.concatenate((starts[1:], [ordinals.size])) - 1 if starts.size else starts
+            index, ordinals = index[closes], ordinals[closes]
+            columns = {metric: entry.pop("close") for metric, entry in ohlc.items()}
+
+        if max_points is not None and index.size > max_points:
+            x = ordinals.astype(np.float64)
+            share = max_points // len(metrics)
+            if share < 3:
+                raise ValueError(f"max_points must be at least 3 per metric, got {max_points} for {len(metrics)}")
+            keep = analytics.lttb_indices(x, columns[metrics[0]], share)
+            for metric in metrics[1:]:
+                keep = np.union1d(keep, analytics.lttb_indices(x, columns[metric], share))
+            index = index[keep]
+            columns = {metric: column[keep] for metric, column in columns.items()}
+            if ohlc is not None:
+                ohlc = {metric: {k: v[keep] for k, v in entry.items()} for metric, entry in ohlc.items()}
+
+        if epoch_days:
+            dates = aligned.ordinals[index] - EPOCH_ORDINAL
+        else:
+            dates = [aligned.iso_dates[i] for i in index.tolist()]
+        return dates, columns, ohlc, hi - lo
+
+    def get_period_stats(self, metric: str, period: str, today: date) -> dict | None:
+        """Precomputed period entry, or None if missing or computed for another day."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.stats_as_of != today:
+            return None
+        return snapshot.period_stats.get((metric, period))
+
+    def get_stats(
+        self,
+        metric: str,
+        query_start: date,
+        query_end: date,
+        period: str | None = None,
+        metrics: Sequence[str] | None = None,
+    ) -> dict:
+        """Stats of the served slice, from the precomputed period table when it matches.
+
+        ``metrics`` is the metric list of the request, which decides the dates
+        the slice is aligned on (defaults to ``metric`` alone).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}
+
+        group = alignment_group(metrics or [metric])
+        aligned = self._aligned(snapshot, group)
+        lo, hi = aligned_slice(aligned.ordinals, query_start, query_end)
+        # Precomputed stats cover the default group only
+        if period is not None and group == METRICS:
+            entry = self.get_period_stats(metric, period, query_end)
+            # Only trust it if it was computed over exactly this slice
+            if entry is not None and entry["points"] == hi - lo and (
+                hi == lo or entry["endDate"] == aligned.iso_dates[hi - 1]
+            ):
+                return entry["stats"]
+
+        return calculate_value_stats(aligned.values[metric][lo:hi].tolist())
+
+    def get_latest_rolling(self) -> dict[str, dict]:
+        snapshot = self._snapshot
+        return snapshot.latest_rolling if snapshot else {}
+
+    def peek_body(self, key: Hashable, encoding: str | None = None) -> tuple[bytes, str | None] | None:
+        """What ``get_body`` would return, if that needs neither a build nor a compression.
+
+        Lets async callers serve hits on the event loop and hand misses to a thread.
+        """
+        with self._bodies_lock:
+            variants = self._bodies.get((self.version, key))
+            if variants is None:
+                return None
+            self._bodies.move_to_end((self.version, key))
+
+        raw = variants[None]
+        if encoding is None or not compression.should_compress(raw):
+            record_cache("body", "hit")
+            return raw, None
+        body = variants.get(encoding)
+        if body is None:
+            return None
+        record_cache("body", "hit")
+        record_cache("compressed", "hit")
+        return body, encoding
+
+    def get_body(
+        self, key: Hashable, build: Callable[[], bytes], encoding: str | None = None
+    ) -> tuple[bytes, str | None]:
+        """Encoded body for ``key`` under the current data version, built on a miss.
+
+        ``key`` must cover everything the body depends on besides the data
+        (endpoint, parameters and, for relative periods, today's date).
+        With ``encoding`` ("gzip" / "br") a compressed copy is returned, unless
+        the body is below the compression threshold. Returns the body and the
+        encoding it is in.
+        """
+        cache_key = (self.version, key)
+        with self._bodies_lock:
+            variants = self._bodies.get(cache_key)
+            if variants is not None:
+                self._bodies.move_to_end(cache_key)
+        record_cache("body", "miss" if variants is None else "hit")
+
+        if variants is None:
+            variants = {None: build()}
+            with self._bodies_lock:
+                self._bodies[cache_key] = variants
+                while len(self._bodies) > self.max_bodies:
+                    self._bodies.popitem(last=False)
+
+        raw = variants[None]
+        if encoding is None or not compression.should_compress(raw):
+            return raw, None
+
+        body = variants.get(encoding)
+        record_cache("compressed", "miss" if body is None else "hit")
+        if body is None:
+            # Racing threads may both compress; the results are identical
+            body = variants[encoding] = compression.compress(raw, encoding)
+        return body, encoding
+
+    def warm(
+        self, bodies: Iterable[tuple[Hashable, Callable[[], bytes]]], encodings: Iterable[str] = ()
+    ) -> int:
+        """Build the given ``(key, build)`` bodies and their compressed copies ahead of the first request."""
+        encodings = tuple(encodings)
+        count = 0
+        for key, build in bodies:
+            self.get_body(key, build)
+            for encoding in encodings:
+                self.get_body(key, build, encoding)
+            count += 1
+        return count
+
+
+series_cache = SeriesCache()
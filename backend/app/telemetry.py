@@ -0,0 +1,205 @@
+"""Request instrumentation: Prometheus metrics and one JSON log line per request.
+
+``TelemetryMiddleware`` is a plain ASGI middleware (no BaseHTTPMiddleware
+task/stream overhead). It times each request with ``perf_counter`` and keeps a
+per-request ``RequestStats`` in a context variable, which the SQLAlchemy
+cursor events, ``timed_encode`` and ``record_cache`` add to, so every log line
+splits the latency into database, serialization and the rest (routing,
+validation, ASGI). Metrics are per process and exposed by ``/metrics``.
+"""
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+import orjson
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.data_service import METRICS, PERIOD_DAYS
+from app.registry import REGISTRY
+
+# Query parameters whose values never reach the request log (the /admin/sync token)
+REDACTED_PARAMS = frozenset({"token"})
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route, status, metric and period",
+    ["method", "route", "status", "metric", "period"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Database time per request", ["route"], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of single database queries", buckets=LATENCY_BUCKETS)
+ENCODE_SECONDS = Histogram(
+    "response_encode_duration_seconds", "JSON serialization time of response bodies", buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+EXTERNAL_API_SECONDS = Histogram(
+    "external_api_request_duration_seconds",
+    "Latency of calls to the market data APIs",
+    ["api"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+EXTERNAL_API_ERRORS = Counter(
+    "external_api_errors_total", "Failed calls to the market data APIs", ["api", "error"]
+)
+
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    cache: dict[str, str] = field(default_factory=dict)
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+
+def timed_encode(encode: Callable[[], bytes]) -> bytes:
+    started = time.perf_counter()
+    body = encode()
+    elapsed = time.perf_counter() - started
+    ENCODE_SECONDS.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.encode_seconds += elapsed
+    return body
+
+
+def record_cache(cache: str, result: str) -> None:
+    """Count a lookup (e.g. ``("body", "hit")``) and note it on the current request."""
+    CACHE_LOOKUPS.labels(cache, result).inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.cache[cache] = result
+
+
+@contextmanager
+def observe_external(api: str) -> Iterator[None]:
+    """Time one call to an external API; exceptions are counted by type and re-raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        EXTERNAL_API_ERRORS.labels(api, type(exc).__name__).inc()
+        raise
+    finally:
+        EXTERNAL_API_SECONDS.labels(api).observe(time.perf_counter() - started)
+
+
+def metrics_response() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _redacted_query(query_string: bytes) -> str:
+    parts = []
+    for part in query_string.decode("latin-1").split("&"):
+        name, sep, _ = part.partition("=")
+        parts.append(f"{name}=***" if sep and name in REDACTED_PARAMS else part)
+    return "&".join(parts)
+
+
+def _labels(scope: dict) -> tuple[str, str, str]:
+    # Only known values become labels so arbitrary query strings can't blow up cardinality
+    route = scope.get("route")
+    route_path = getattr(route, "path", None) or "unmatched"
+
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    metric = (params.get("metric") or params.get("metrics") or [""])[0]
+    names = metric.split(",")
+    if metric and not all(name in REGISTRY for name in names):
+        metric = "invalid"
+    elif len(names) > 1 and set(names) != set(METRICS):
+        # Any combination of registered metrics is valid; don't label each one
+        metric = "multi"
+
+    if params.get("startDate") and params.get("endDate"):
+        period = "custom"
+    else:
+        period = (params.get("period") or [""])[0]
+        if period and period not in PERIOD_DAYS:
+            period = "invalid"
+    return route_path, metric, period
+
+
+class TelemetryMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            duration = time.perf_counter() - started
+            route, metric, period = _labels(scope)
+
+            REQUEST_LATENCY.labels(scope["method"], route, str(status), metric, period).observe(duration)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.db_queries)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
+
+            log = {
+                "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "event": "request",
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "query": _redacted_query(scope.get("query_string", b"")),
+                "status": status,
+                "bytes": size,
+                "durationMs": round(duration * 1000, 2),
+                "dbQueries": stats.db_queries,
+                "dbMs": round(stats.db_seconds * 1000, 2),
+                "encodeMs": round(stats.encode_seconds * 1000, 2),
+                "cache": stats.cache,
+            }
+            print(orjson.dumps(log).decode(), flush=True)
@@ -0,0 +1,80 @@
+"""Compare two ``bench.run`` reports and flag regressions.
+
+    python -m bench.compare baseline.json current.json --threshold 0.15
+
+Latency results compare ``p50_ms``, throughput results ``rps`` /
+``rows_per_sec`` and job timings ``seconds``; ``p95_ms`` is shown but too
+noisy on sub-millisecond cases to gate on. Exits with status 1 when any gated
+field of a shared result got worse by more than ``--threshold`` (a fraction).
+"""
+
+import argparse
+import json
+import sys
+
+# (field, True when larger is better, counts as a regression)
+FIELDS = (
+    ("p50_ms", False, True),
+    ("p95_ms", False, False),
+    ("rps", True, True),
+    ("rows_per_sec", True, True),
+    ("seconds", False, True),
+)
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[tuple], set[str]]:
+    """Return ``(name, field, old, new, change, regressed)`` rows and the names that regressed."""
+    rows = []
+    regressions = set()
+    for name in sorted(baseline["results"].keys() & current["results"].keys()):
+        if name.startswith("setup."):
+            continue
+        old, new = baseline["results"][name], current["results"][name]
+        for field, higher_is_better, gated in FIELDS:
+            if field not in old or field not in new or not old[field]:
+                continue
+            change = (new[field] - old[field]) / old[field]
+            regressed = gated and (-change if higher_is_better else change) > threshold
+            rows.append((name, field, old[field], new[field], change, regressed))
+            if regressed:
+                regressions.add(name)
+    return rows, regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown as a fraction (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline, current = _load(args.baseline), _load(args.current)
+    rows, regressions = compare(baseline, current, args.threshold)
+
+    print(f"baseline {baseline['meta'].get('commit')} -> current {current['meta'].get('commit')}")
+    if baseline["meta"].get("dialect") != current["meta"].get("dialect"):
+        print("warning: reports were taken on different databases")
+
+    width = max((len(row[0]) for row in rows), default=10)
+    for name, field, old, new, change, regressed in rows:
+        marker = "  <-- regression" if regressed else ""
+        print(f"{name:<{width}}  {field:<12} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{marker}")
+
+    missing = sorted(baseline["results"].keys() - current["results"].keys())
+    if missing:
+        print(f"missing in current: {', '.join(missing)}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
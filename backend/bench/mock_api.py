@@ -0,0 +1,122 @@
+"""Local stand-in for the data.go.kr KOSPI and Korea Eximbank APIs.
+
+Serves ``/kospi`` (paged ``getStockMarketIndex`` JSON) and ``/exim``
+(``exchangeJSON`` list) with deterministic values for every weekday, after an
+optional fixed delay per request so fetch concurrency shows up in the numbers.
+"""
+
+import json
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def kospi_close(day: date) -> float:
+    n = day.toordinal()
+    return round(2500 + 300 * math.sin(n / 90) + 40 * math.sin(n / 7), 2)
+
+
+def usdkrw_rate(day: date) -> float:
+    n = day.toordinal()
+    return round(1300 + 80 * math.sin(n / 120) + 5 * math.cos(n / 5), 2)
+
+
+def _weekdays(start: date, end: date) -> list[date]:
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def _kospi_payload(params: dict[str, str]) -> dict:
+    start = datetime.strptime(params["beginBasDt"], "%Y%m%d").date()
+    end = datetime.strptime(params["endBasDt"], "%Y%m%d").date()
+    page_size = int(params.get("numOfRows", "10"))
+    page_no = int(params.get("pageNo", "1"))
+
+    # The real API returns newest first and nothing after the latest close
+    days = list(reversed(_weekdays(start, min(end, date.today()))))
+    page = days[(page_no - 1) * page_size : page_no * page_size]
+    items = [{"basDt": day.strftime("%Y%m%d"), "idxNm": "코스피", "clpr": str(kospi_close(day))} for day in page]
+    return {
+        "response": {
+            "header": {"resultCode": "00", "resultMsg": "NORMAL SERVICE."},
+            "body": {
+                "numOfRows": page_size,
+                "pageNo": page_no,
+                "totalCount": len(days),
+                "items": {"item": items},
+            },
+        }
+    }
+
+
+def _exim_payload(params: dict[str, str]) -> list[dict]:
+    day = datetime.strptime(params["searchdate"], "%Y%m%d").date()
+    if day.weekday() >= 5:
+        return []
+    usd = usdkrw_rate(day)
+    return [
+        {"result": 1, "cur_unit": "CNH", "deal_bas_r": f"{usd / 7.2:,.2f}"},
+        {"result": 1, "cur_unit": "EUR", "deal_bas_r": f"{usd * 1.08:,.2f}"},
+        {"result": 1, "cur_unit": "JPY(100)", "deal_bas_r": "912.34"},
+        {"result": 1, "cur_unit": "KRW", "deal_bas_r": "1"},
+        {"result": 1, "cur_unit": "USD", "deal_bas_r": f"{usd:,.2f}"},
+    ]
+
+
+class MockApiServer:
+    """``with MockApiServer(latency=0.02) as server: server.url("/kospi")``"""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1") -> None:
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if parsed.path == "/kospi":
+                    payload = _kospi_payload(params)
+                elif parsed.path == "/exim":
+                    payload = _exim_payload(params)
+                else:
+                    self.send_error(404)
+                    return
+
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self) -> "MockApiServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,339 @@
+"""Benchmark the series read path and the ingestion jobs.
+
+    cd backend
+    BENCH_DATABASE_URL=postgresql+psycopg2://localhost/market_bench python -m bench.run -o bench.json
+    python -m bench.compare baseline.json bench.json
+
+The target database is wiped and reseeded with synthetic data, so it is only
+taken from ``BENCH_DATABASE_URL`` / ``--database-url``, never ``DATABASE_URL``.
+A SQLite URL works for the read benchmarks; ``run_sync`` and ``seed_data``
+use Postgres-only SQL and are skipped there. External APIs are served by
+``bench.mock_api`` on localhost.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta, timezone
+
+from bench.mock_api import MockApiServer
+
+CUSTOM_RANGES = 4
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+
+def summarize(samples: list[float], wall_seconds: float | None = None) -> dict:
+    """Latency percentiles in ms (and throughput when the wall time is known)."""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    result = {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "p50_ms": round(percentile(50) * 1000, 4),
+        "p95_ms": round(percentile(95) * 1000, 4),
+        "p99_ms": round(percentile(99) * 1000, 4),
+    }
+    if wall_seconds:
+        result["rps"] = round(len(ordered) / wall_seconds, 2)
+    return result
+
+
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int = 3) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _custom_ranges(first: date, last: date, count: int, rng: random.Random) -> list[tuple[str, str]]:
+    ranges = []
+    span = (last - first).days
+    for _ in range(count):
+        length = rng.randint(20, min(span, 1500))
+        start = first + timedelta(days=rng.randint(0, span - length))
+        ranges.append((start.isoformat(), (start + timedelta(days=length)).isoformat()))
+    return ranges
+
+
+def reset_schema() -> None:
+    from app.db import engine
+    from app.models import Base
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def seed_synthetic(years: int, rng: random.Random) -> int:
+    """Random-walk KOSPI and USD/KRW closes for every weekday of the last ``years`` years."""
+    from sqlalchemy import insert
+
+    from app.aggregates import refresh_aggregates
+    from app.db import SessionLocal
+    from app.jobs.upsert import rebuild_aligned
+    from app.models import MarketSeries
+
+    today = date.today()
+    day = today - timedelta(days=365 * years)
+    kospi, usdkrw = 2500.0, 1300.0
+    rows = []
+    while day <= today:
+        if day.weekday() < 5:
+            kospi *= 1 + rng.gauss(0, 0.01)
+            usdkrw *= 1 + rng.gauss(0, 0.004)
+            rows.append({"metric": "kospi", "date": day, "value": round(kospi, 2), "source": "bench"})
+            # USD/KRW misses a few days KOSPI has, so the alignment has work to do
+            if rng.random() > 0.02:
+                rows.append({"metric": "usdkrw", "date": day, "value": round(usdkrw, 2), "source": "bench"})
+        day += timedelta(days=1)
+
+    db = SessionLocal()
+    try:
+        for offset in range(0, len(rows), 1000):
+            db.execute(insert(MarketSeries), rows[offset : offset + 1000])
+        rebuild_aligned(db)
+        refresh_aggregates(db, today)
+        db.commit()
+    finally:
+        db.close()
+    return len(rows)
+
+
+def bench_data_service(results: dict, iterations: int, custom_ranges: list[tuple[str, str]]) -> None:
+    from app.data_service import METRICS, PERIOD_DAYS, calculate_stats, get_series_from_db
+    from app.db import SessionLocal
+
+    # Custom ranges move with today, so they are labelled by position, not by date
+    cases = [(period, period, None, None) for period in PERIOD_DAYS]
+    cases += [(f"custom{i}", "custom", start, end) for i, (start, end) in enumerate(custom_ranges)]
+
+    db = SessionLocal()
+    try:
+        for metric in METRICS:
+            for label, period, start, end in cases:
+                series = get_series_from_db(db, metric, period, start, end)
+                results[f"get_series_from_db.{metric}.{label}"] = {
+                    **summarize(time_calls(lambda: get_series_from_db(db, metric, period, start, end), iterations)),
+                    "points": len(series),
+                }
+                results[f"calculate_stats.{metric}.{label}"] = summarize(
+                    time_calls(lambda: calculate_stats(series), iterations * 10)
+                )
+    finally:
+        db.close()
+
+
+async def _load(client, urls: list[str], concurrency: int) -> tuple[list[float], float, int]:
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    samples: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            url = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(url)
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started, errors
+
+
+def bench_api(results: dict, total_requests: int, custom_ranges: list[tuple[str, str]]) -> None:
+    import httpx
+
+    # httpx logs every request at INFO through the app's stdout handler
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    from app.data_service import METRICS, PERIOD_DAYS
+    from app.db import SessionLocal
+    from app.main import app
+    from app.series_cache import series_cache
+
+    db = SessionLocal()
+    try:
+        series_cache.load(db)
+    finally:
+        db.close()
+
+    urls = [f"/api/series?metric={metric}&period={period}" for metric in METRICS for period in PERIOD_DAYS]
+    urls += [
+        f"/api/series?metric={metric}&period=custom&startDate={start}&endDate={end}"
+        for metric in METRICS
+        for start, end in custom_ranges
+    ]
+    urls += [f"/api/series/batch?metrics={','.join(METRICS)}&period={period}" for period in PERIOD_DAYS]
+    workload = [urls[i % len(urls)] for i in range(total_requests)]
+
+    async def run_levels(name: str) -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await _load(client, urls, 4)  # warm-up
+            for concurrency in CONCURRENCY_LEVELS:
+                samples, wall, errors = await _load(client, workload, concurrency)
+                results[f"{name}.c{concurrency}"] = {**summarize(samples, wall), "errors": errors}
+
+    max_bodies = series_cache.max_bodies
+    # The request log goes to stdout; keep it out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(run_levels("api.series"))
+        # Same load with the encoded-body memo disabled: every request slices and serializes
+        series_cache.max_bodies = 0
+        try:
+            asyncio.run(run_levels("api.series_uncached"))
+        finally:
+            series_cache.max_bodies = max_bodies
+
+
+def bench_ingestion(results: dict, seed_years: int, gap_days: int) -> None:
+    from sqlalchemy import delete, func, select
+
+    from app.db import SessionLocal
+    from app.jobs.seed_initial import seed_data
+    from app.jobs.sync_daily import run_sync
+    from app.models import MarketSeries, SyncWatermark
+
+    reset_schema()
+    today = date.today()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        seed_data(today - timedelta(days=365 * seed_years), today)
+        seed_seconds = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(func.count(MarketSeries.id))).scalar()
+        # Punch a gap at the end and forget the watermarks so run_sync has to find and fill it
+        db.execute(delete(MarketSeries).where(MarketSeries.date > today - timedelta(days=gap_days)))
+        db.execute(delete(SyncWatermark))
+        db.commit()
+    finally:
+        db.close()
+
+    results["ingest.seed_data"] = {
+        "seconds": round(seed_seconds, 3),
+        "rows": rows,
+        "rows_per_sec": round(rows / seed_seconds, 1),
+    }
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        run_sync()
+        gap_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        run_sync()
+        noop_seconds = time.perf_counter() - started
+
+    results["ingest.run_sync.gap"] = {"seconds": round(gap_seconds, 3), "gap_days": gap_days}
+    results["ingest.run_sync.noop"] = {"seconds": round(noop_seconds, 3)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--years", type=int, default=10, help="years of synthetic history for the read benchmarks")
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per data_service case")
+    parser.add_argument("--requests", type=int, default=500, help="requests per API concurrency level")
+    parser.add_argument("--seed-years", type=int, default=3, help="history fetched by the seed_data benchmark")
+    parser.add_argument("--gap-days", type=int, default=10, help="days removed before the run_sync benchmark")
+    parser.add_argument("--api-latency-ms", type=float, default=20.0, help="delay of the mock external APIs")
+    parser.add_argument("--skip-ingestion", action="store_true")
+    parser.add_argument("--random-seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("set BENCH_DATABASE_URL or --database-url (the database is wiped)")
+
+    with MockApiServer(latency=args.api_latency_ms / 1000) as mock:
+        # app modules read these at import time
+        os.environ["DATABASE_URL"] = args.database_url
+        os.environ.setdefault("KOSPI_API_KEY", "bench")
+        os.environ.setdefault("EXIM_API_KEY", "bench")
+        os.environ["KOSPI_API_URL"] = mock.url("/kospi")
+        os.environ["EXIM_API_URL"] = mock.url("/exim")
+        os.environ.setdefault("EXIM_RATE_PER_SEC", "0")
+        # Measure the fetch path, not the on-disk response cache
+        os.environ.setdefault("API_CACHE_MODE", "off")
+
+        from app.db import engine
+
+        rng = random.Random(args.random_seed)
+        results: dict[str, dict] = {}
+
+        reset_schema()
+        started = time.perf_counter()
+        rows = seed_synthetic(args.years, rng)
+        results["setup.seed_synthetic"] = {"seconds": round(time.perf_counter() - started, 3), "rows": rows}
+
+        today = date.today()
+        custom_ranges = _custom_ranges(today - timedelta(days=365 * args.years), today, CUSTOM_RANGES, rng)
+
+        bench_data_service(results, args.iterations, custom_ranges)
+        bench_api(results, args.requests, custom_ranges)
+
+        if args.skip_ingestion:
+            pass
+        elif engine.dialect.name != "postgresql":
+            print(f"[bench] Skipping ingestion benchmarks on {engine.dialect.name}", file=sys.stderr)
+        else:
+            bench_ingestion(results, args.seed_years, args.gap_days)
+            results["ingest.mock_api_requests"] = {"count": mock.requests}
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": engine.dialect.name,
+            "args": {key: value for key, value in vars(args).items() if key != "database_url"},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"[bench] Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,7 +14,7 @@ from datetime import datetime
 # Add app to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 # 환경변수 검증
@@ -28,25 +28,6 @@ def check_env():
         sys.exit(1)
 
 
-def acquire_advisory_lock(engine, lock_id: int = 12345) -> bool:
-    """
-    Postgres advisory lock 획득 시도.
-    다른 프로세스가 이미 실행 중이면 False 반환.
-    """
-    with engine.connect() as conn:
-        result = conn.execute(text(f"SELECT pg_try_advisory_lock({lock_id})"))
-        locked = result.scalar()
-        conn.commit()
-        return locked
-
-
-def release_advisory_lock(engine, lock_id: int = 12345):
-    """Advisory lock 해제"""
-    with engine.connect() as conn:
-        conn.execute(text(f"SELECT pg_advisory_unlock({lock_id})"))
-        conn.commit()
-
-
 def main():
     start_time = datetime.now()
     print(f"[cron] ========================================", flush=True)
@@ -60,11 +41,21 @@ def main():
     database_url = os.environ["DATABASE_URL"]
     engine = create_engine(database_url)
 
-    # Advisory lock 획득 시도
-    if not acquire_advisory_lock(engine):
-        print("[cron] WARNING: Another sync process is running. Exiting.", flush=True)
-        sys.exit(0)  # 중복 실행은 에러가 아님
+    # Advisory lock 획득 시도 (lock/unlock은 같은 커넥션에서)
+    from app.jobs.locks import advisory_lock
+
+    try:
+        with advisory_lock(engine) as locked:
+            if not locked:
+                print("[cron] WARNING: Another sync process is running. Exiting.", flush=True)
+                sys.exit(0)  # 중복 실행은 에러가 아님
+            run_and_report(start_time)
+    finally:
+        engine.dispose()
+
 
+def run_and_report(start_time: datetime):
+    """sync 실행 후 결과 출력 (실패 시 exit 1)"""
     try:
         # sync 로직 import (DB 연결 후)
         from app.jobs.sync_daily import run_sync
@@ -79,7 +70,7 @@ def main():
         print(f"[cron] Duration: {duration:.2f} seconds", flush=True)
         print(f"[cron] Results:", flush=True)
         print(f"[cron]   - KOSPI: {result.get('kospi', 'N/A')}", flush=True)
-        print(f"[cron]   - USD/KRW: {result.get('usdkrw', 'N/A')}", flush=True)
+        print(f"[cron]   - EXIM: {result.get('exim', 'N/A')}", flush=True)
         print(f"[cron] ========================================", flush=True)
 
     except Exception as e:
@@ -91,10 +82,6 @@ def main():
         print(f"[cron] ========================================", flush=True)
         sys.exit(1)
 
-    finally:
-        release_advisory_lock(engine)
-        engine.dispose()
-
 
 if __name__ == "__main__":
     main()
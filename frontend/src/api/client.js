@@ -1,45 +1,166 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8001";
 const FALLBACK_DATA_URL = import.meta.env.VITE_FALLBACK_DATA_URL || null;
 const API_TIMEOUT = 10000; // 10초 (무료 서버 cold start 대비)
+const MAX_CHART_POINTS = 500; // 사용자 지정 기간은 서버에서 LTTB로 줄여서 받음
 
-export async function fetchSeries(metric, period, startDate = null, endDate = null) {
-  let url = `${API_BASE_URL}/api/series?metric=${metric}&period=${period}`;
-
+function withRange(url, startDate, endDate) {
   if (startDate) {
     url += `&startDate=${startDate}`;
   }
   if (endDate) {
     url += `&endDate=${endDate}`;
   }
+  return url;
+}
 
-  try {
-    console.log(`[API 호출] ${url}`);
-    const startTime = performance.now();
+async function requestJson(url) {
+  console.log(`[API 호출] ${url}`);
+  const startTime = performance.now();
 
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => controller.abort(), API_TIMEOUT);
+  const controller = new AbortController();
+  const timeoutId = setTimeout(() => controller.abort(), API_TIMEOUT);
 
-    const res = await fetch(url, { signal: controller.signal });
-    clearTimeout(timeoutId);
+  const res = await fetch(url, { signal: controller.signal });
+  clearTimeout(timeoutId);
 
-    const duration = Math.round(performance.now() - startTime);
+  const duration = Math.round(performance.now() - startTime);
 
-    if (!res.ok) {
-      console.error(`[API 오류] ${res.status} ${res.statusText} (${duration}ms)`);
-      throw new Error("Failed to fetch series data");
-    }
+  if (!res.ok) {
+    console.error(`[API 오류] ${res.status} ${res.statusText} (${duration}ms)`);
+    throw new Error("Failed to fetch series data");
+  }
+
+  return { data: await res.json(), duration };
+}
+
+export async function fetchSeries(metric, period, startDate = null, endDate = null) {
+  const url = withRange(`${API_BASE_URL}/api/series?metric=${metric}&period=${period}`, startDate, endDate);
 
-    const data = await res.json();
+  try {
+    const { data, duration } = await requestJson(url);
     console.log(`[API 응답] ${metric}/${period}: ${data.series?.length}개 데이터 (${duration}ms)`);
 
     return data;
   } catch (err) {
     console.warn(`[API 실패] ${metric}/${period}: ${err.message}, fallback 데이터 시도...`);
-    return loadFallbackData(metric, period);
+    return loadFallbackData(metric, period, startDate, endDate);
+  }
+}
+
+// 여러 지표를 공통 거래일 기준으로 한 번에 조회
+export async function fetchSeriesBatch(metrics, period, startDate = null, endDate = null) {
+  let url = withRange(
+    `${API_BASE_URL}/api/series/batch?metrics=${metrics.join(",")}&period=${period}`,
+    startDate,
+    endDate,
+  );
+  // 프리셋 기간은 서버에 미리 만들어 둔 응답을 그대로 받도록 custom 범위에만 적용 (stats는 원본 기준)
+  if (startDate && endDate) {
+    url += `&maxPoints=${MAX_CHART_POINTS}`;
+  }
+
+  try {
+    const { data, duration } = await requestJson(url);
+    console.log(`[API 응답] ${metrics.join(",")}/${period}: ${data.dates?.length}개 데이터 (${duration}ms)`);
+
+    // 컴포넌트가 사용하는 metric별 응답 형태로 변환
+    const result = {};
+    for (const metric of data.metrics) {
+      result[metric] = {
+        metric,
+        period: data.period,
+        startDate: data.startDate,
+        endDate: data.endDate,
+        series: data.dates.map((date, i) => ({ date, value: data.values[metric][i] })),
+        stats: data.stats[metric],
+      };
+    }
+    return result;
+  } catch (err) {
+    console.warn(`[API 실패] ${metrics.join(",")}/${period}: ${err.message}, fallback 데이터 시도...`);
+    const result = {};
+    for (const metric of metrics) {
+      result[metric] = await loadFallbackData(metric, period, startDate, endDate);
+    }
+    return result;
+  }
+}
+
+// fallback 파일은 한 번만 받아서 재사용 (batch 조회 시 지표마다 다시 받지 않음)
+const fallbackFiles = new Map();
+
+function fetchFallbackFile(url) {
+  if (!fallbackFiles.has(url)) {
+    const promise = fetch(url).then((res) => {
+      if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+      return res.json();
+    });
+    // 실패한 요청은 다음 시도 때 다시 받도록 제거
+    promise.catch(() => fallbackFiles.delete(url));
+    fallbackFiles.set(url, promise);
+  }
+  return fallbackFiles.get(url);
+}
+
+// 백엔드 calculate_value_stats와 같은 계산 (v2 custom 구간용)
+function calculateStats(values) {
+  if (values.length === 0) return {};
+  const round = (value) => Math.round(value * 100) / 100;
+  const first = values[0];
+  const change = values[values.length - 1] - first;
+  return {
+    min: round(Math.min(...values)),
+    max: round(Math.max(...values)),
+    avg: round(values.reduce((sum, value) => sum + value, 0) / values.length),
+    change: round(change),
+    changePct: round(first !== 0 ? (change / first) * 100 : 0),
+  };
+}
+
+// v1: {metric: {period: /api/series 응답}}
+function fromSnapshotV1(snapshot, metric, period) {
+  const key = period === "custom" ? "1m" : period;
+  return snapshot?.[metric]?.[key] ?? null;
+}
+
+// v2: 공통 dates / metric별 values 한 벌 + 기간별 [start, end) index 범위와 stats
+function fromSnapshotV2(snapshot, metric, period, startDate, endDate) {
+  const { dates, values, periods, custom } = snapshot;
+  if (!values?.[metric]) return null;
+
+  let start;
+  let end;
+  let stats;
+  const inCustomRange =
+    period === "custom" && custom && startDate && endDate && startDate >= custom.startDate && startDate <= endDate;
+
+  if (inCustomRange) {
+    // ISO 날짜 문자열은 정렬 순서가 날짜 순서와 같음
+    start = dates.findIndex((date) => date >= startDate);
+    end = dates.findIndex((date) => date > endDate);
+    if (start === -1) start = dates.length;
+    if (end === -1) end = dates.length;
+    // 차트용 최소 2개 데이터
+    start = Math.max(0, Math.min(start, end - 2));
+    stats = calculateStats(values[metric].slice(start, end));
+  } else {
+    const window = periods?.[period === "custom" ? "1m" : period];
+    if (!window) return null;
+    ({ start, end } = window);
+    stats = window.stats?.[metric] ?? null;
   }
+
+  return {
+    metric,
+    period,
+    startDate: inCustomRange ? startDate : null,
+    endDate: inCustomRange ? endDate : null,
+    series: dates.slice(start, end).map((date, i) => ({ date, value: values[metric][start + i] })),
+    stats,
+  };
 }
 
-async function loadFallbackData(metric, period) {
+async function loadFallbackData(metric, period, startDate = null, endDate = null) {
   // 1순위: 외부 fallback URL (GitHub raw 등, 재배포 없이 업데이트 가능)
   // 2순위: 로컬 static fallback (빌드 시 포함된 파일)
   const sources = [
@@ -50,16 +171,15 @@ async function loadFallbackData(metric, period) {
   for (const url of sources) {
     try {
       console.log(`[Fallback 시도] ${url}`);
-      const res = await fetch(url);
-      if (!res.ok) continue;
-
-      const allData = await res.json();
-      const key = period === "custom" ? "1m" : period;
-      const data = allData?.[metric]?.[key];
+      const snapshot = await fetchFallbackFile(url);
+      const data =
+        snapshot?.version === 2
+          ? fromSnapshotV2(snapshot, metric, period, startDate, endDate)
+          : fromSnapshotV1(snapshot, metric, period);
 
       if (data && data.series && data.series.length > 0) {
-        console.log(`[Fallback 성공] ${metric}/${key} from ${url}`);
-        return { ...data, _fallback: true, _fallbackUpdatedAt: allData.updatedAt };
+        console.log(`[Fallback 성공] ${metric}/${period} from ${url}`);
+        return { ...data, _fallback: true, _fallbackUpdatedAt: snapshot.updatedAt };
       }
     } catch (e) {
       console.warn(`[Fallback 실패] ${url}: ${e.message}`);
@@ -1,6 +1,6 @@
 import { useState, useMemo } from "react";
 import { useQuery } from "@tanstack/react-query";
-import { fetchSeries } from "../api/client";
+import { fetchSeriesBatch } from "../api/client";
 import Header from "../components/Header";
 import Footer from "../components/Footer";
 import HeroBox from "../components/HeroBox";
@@ -41,26 +41,22 @@ export default function Dashboard() {
   const isValidCustomRange =
     !isCustom || (startDate && endDate && startDate <= endDate);
 
-  const kospiQuery = useQuery({
-    queryKey: ["series", "kospi", period, queryStartDate, queryEndDate],
-    queryFn: () => fetchSeries("kospi", period, queryStartDate, queryEndDate),
+  const seriesQuery = useQuery({
+    queryKey: ["series", "batch", period, queryStartDate, queryEndDate],
+    queryFn: () => fetchSeriesBatch(["kospi", "usdkrw"], period, queryStartDate, queryEndDate),
     staleTime: 1000 * 60 * 5,
     enabled: isValidCustomRange,
   });
 
-  const usdkrwQuery = useQuery({
-    queryKey: ["series", "usdkrw", period, queryStartDate, queryEndDate],
-    queryFn: () => fetchSeries("usdkrw", period, queryStartDate, queryEndDate),
-    staleTime: 1000 * 60 * 5,
-    enabled: isValidCustomRange,
-  });
+  const kospiData = seriesQuery.data?.kospi;
+  const usdkrwData = seriesQuery.data?.usdkrw;
 
-  const isLoading = kospiQuery.isLoading || usdkrwQuery.isLoading;
-  const isFetching = kospiQuery.isFetching || usdkrwQuery.isFetching;
-  const error = kospiQuery.error || usdkrwQuery.error;
-  const hasData = kospiQuery.data && usdkrwQuery.data;
-  const isFallback = kospiQuery.data?._fallback || usdkrwQuery.data?._fallback;
-  const fallbackUpdatedAt = kospiQuery.data?._fallbackUpdatedAt || usdkrwQuery.data?._fallbackUpdatedAt;
+  const isLoading = seriesQuery.isLoading;
+  const isFetching = seriesQuery.isFetching;
+  const error = seriesQuery.error;
+  const hasData = kospiData && usdkrwData;
+  const isFallback = kospiData?._fallback || usdkrwData?._fallback;
+  const fallbackUpdatedAt = kospiData?._fallbackUpdatedAt || usdkrwData?._fallbackUpdatedAt;
 
   return (
     <div
@@ -149,18 +145,18 @@ export default function Dashboard() {
         {!isLoading && !isFetching && !error && hasData && (
           <>
             <CurrentPrice
-              kospiData={kospiQuery.data}
-              usdkrwData={usdkrwQuery.data}
+              kospiData={kospiData}
+              usdkrwData={usdkrwData}
             />
 
             <DualChart
-              kospiData={kospiQuery.data}
-              usdkrwData={usdkrwQuery.data}
+              kospiData={kospiData}
+              usdkrwData={usdkrwData}
             />
 
             <CompareStats
-              kospiData={kospiQuery.data}
-              usdkrwData={usdkrwQuery.data}
+              kospiData={kospiData}
+              usdkrwData={usdkrwData}
             />
           </>
         )}
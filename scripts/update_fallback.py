@@ -1,78 +1,328 @@
 """
-Backend API에서 데이터를 가져와 frontend/public/fallback-data.json을 업데이트합니다.
+frontend/public/fallback-data.json을 업데이트합니다.
+
+- 기본: Backend API에서 metric/period 조합을 동시에 가져옴
+- --from-db: HTTP 없이 DB에서 직접 생성 (DATABASE_URL 필요, cold start 영향 없음)
+- minified JSON + .gz (brotli 설치 시 .br) 파일을 함께 저장
+- updatedAt을 제외한 내용의 hash가 이전 파일과 같으면 쓰지 않음 (data 브랜치 commit no-op)
+
+형식 (--format):
+- v2 (기본): 공통 거래일 dates 한 벌 + metric별 values 한 벌,
+  기간은 [start, end) index 범위와 미리 계산된 stats로 표현.
+  --custom-days N이면 마지막 저장 거래일까지 N일치를 담고 "custom" 구간으로 표시 (사용자 지정 기간 대응,
+  오늘이 아니라 마지막 거래일 기준이라 새 데이터가 없는 날은 같은 snapshot)
+  {"version": 2, "metrics": [...], "dates": [...], "values": {metric: [...]},
+   "periods": {period: {"start": i, "end": j, "stats": {metric: {...}}}},
+   "custom": {"startDate": ..., "endDate": ...}, "updatedAt": ...}
+- v1: metric/period별 /api/series 응답 전체 ({metric: {period: response}, updatedAt})
 
 사용법:
   python scripts/update_fallback.py [API_URL]
+  python scripts/update_fallback.py --from-db --custom-days 730
 
 예시:
   python scripts/update_fallback.py https://market-index-backend.onrender.com
 """
 
+import argparse
+import gzip
+import hashlib
 import json
 import sys
+import time
 import urllib.request
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 
-API_URL = sys.argv[1] if len(sys.argv) > 1 else "https://market-index-backend.onrender.com"
-OUTPUT = Path(__file__).resolve().parent.parent / "frontend" / "public" / "fallback-data.json"
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_API_URL = "https://market-index-backend.onrender.com"
+OUTPUT = ROOT / "frontend" / "public" / "fallback-data.json"
 
 METRICS = ["kospi", "usdkrw"]
 PERIODS = ["1d", "1w", "1m", "3m", "1y"]
 
 
-def fetch_json(url):
-    req = urllib.request.Request(url, headers={"User-Agent": "fallback-updater"})
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+def fetch_json(url, timeout=30):
+    req = urllib.request.Request(url, headers={"User-Agent": "fallback-updater", "Accept-Encoding": "gzip"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        body = resp.read()
+        if resp.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body.decode("utf-8"))
 
 
-def main():
-    print(f"API: {API_URL}")
-    print(f"Output: {OUTPUT}\n")
+def empty_payload(metric, period):
+    return {
+        "metric": metric,
+        "period": period,
+        "startDate": None,
+        "endDate": None,
+        "series": [],
+        "stats": None,
+    }
 
-    # 서버 health check
-    try:
-        health = fetch_json(f"{API_URL}/health")
-        print(f"Health: {health.get('status', 'unknown')}\n")
-    except Exception as e:
-        print(f"서버에 연결할 수 없습니다: {e}")
+
+def wait_for_server(api_url, attempts=6, delay=10):
+    """무료 서버 cold start 대비: health check를 몇 번 재시도"""
+    for attempt in range(1, attempts + 1):
+        try:
+            health = fetch_json(f"{api_url}/health", timeout=60)
+            print(f"Health: {health.get('status', 'unknown')}\n")
+            return True
+        except Exception as e:
+            print(f"Health check {attempt}/{attempts} 실패: {e}")
+            if attempt < attempts:
+                time.sleep(delay)
+    return False
+
+
+def build_from_api(api_url, concurrency=8):
+    if not wait_for_server(api_url):
+        print("서버에 연결할 수 없습니다")
         sys.exit(1)
 
-    result = {}
-    success = 0
+    combos = [(metric, period) for metric in METRICS for period in PERIODS]
+
+    def fetch(combo):
+        metric, period = combo
+        try:
+            return combo, fetch_json(f"{api_url}/api/series?metric={metric}&period={period}"), None
+        except Exception as e:
+            return combo, None, e
+
+    result = {metric: {} for metric in METRICS}
     fail = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for (metric, period), data, error in executor.map(fetch, combos):
+            if error is None:
+                result[metric][period] = data
+                print(f"  OK  {metric}/{period}: {len(data.get('series', []))}건")
+            else:
+                result[metric][period] = empty_payload(metric, period)
+                print(f"  FAIL {metric}/{period}: {error}")
+                fail += 1
+    return result, fail
 
+
+def load_series_cache():
+    sys.path.insert(0, str(ROOT / "backend"))
+    from app.db import SessionLocal
+    from app.series_cache import series_cache
+
+    db = SessionLocal()
+    try:
+        series_cache.load(db)
+    finally:
+        db.close()
+    return series_cache
+
+
+def build_from_db():
+    """/api/series와 같은 응답을 series cache로 직접 생성"""
+    series_cache = load_series_cache()
+    from app.data_service import resolve_range
+
+    result = {metric: {} for metric in METRICS}
     for metric in METRICS:
-        result[metric] = {}
         for period in PERIODS:
-            url = f"{API_URL}/api/series?metric={metric}&period={period}"
-            try:
-                data = fetch_json(url)
-                count = len(data.get("series", []))
-                result[metric][period] = data
-                print(f"  OK  {metric}/{period}: {count}건")
-                success += 1
-            except Exception as e:
-                print(f"  FAIL {metric}/{period}: {e}")
-                result[metric][period] = {
-                    "metric": metric,
-                    "period": period,
-                    "startDate": None,
-                    "endDate": None,
-                    "series": [],
-                    "stats": None,
-                }
-                fail += 1
+            query_start, query_end = resolve_range(period)
+            series = series_cache.get_series(metric, query_start, query_end)
+            result[metric][period] = {
+                **empty_payload(metric, period),
+                "series": series,
+                "stats": series_cache.get_stats(metric, query_start, query_end, period),
+            }
+            print(f"  OK  {metric}/{period}: {len(series)}건")
+    return result, 0
 
-    result["updatedAt"] = datetime.now(timezone.utc).isoformat()
 
-    OUTPUT.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+def preset_requests():
+    """v2에 필요한 기간별 (key, period, startDate, endDate) 목록"""
+    return [(period, period, None, None) for period in PERIODS]
+
+
+def custom_request(custom_days, batches):
+    """dates/values 전체 구간("base") 요청: 마지막 저장 거래일까지 custom_days일
+
+    date.today() 기준이면 새 데이터가 없어도 매일 구간이 밀려 hash가 바뀌므로
+    기간별 응답의 마지막 거래일에 고정
+    """
+    last_dates = [batch["dates"][-1] for batch in batches.values() if batch["dates"]]
+    end = date.fromisoformat(max(last_dates)) if last_dates else date.today()
+    start = end - timedelta(days=custom_days - 1)
+    return ("base", "custom", start.isoformat(), end.isoformat())
+
+
+def batch_from_api(api_url, period, start_date, end_date):
+    url = f"{api_url}/api/series/batch?metrics={','.join(METRICS)}&period={period}"
+    if start_date and end_date:
+        url += f"&startDate={start_date}&endDate={end_date}"
+    return fetch_json(url)
+
+
+def batch_from_db(series_cache, period, start_date, end_date):
+    """/api/series/batch와 같은 응답을 series cache로 직접 생성"""
+    from app.data_service import resolve_range
+
+    query_start, query_end = resolve_range(period, start_date, end_date)
+    stats_period = None if start_date and end_date else period
+    dates, values = series_cache.get_columns(METRICS, query_start, query_end)
+    return {
+        "dates": dates,
+        "values": {metric: column.tolist() for metric, column in values.items()},
+        "stats": {
+            metric: series_cache.get_stats(metric, query_start, query_end, stats_period) for metric in METRICS
+        },
+    }
+
+
+def build_v2(batches, custom_days):
+    """기간별 batch 응답을 공통 dates/values 한 벌과 index 범위로 합침"""
+    # 가장 긴 구간(1y 또는 custom)이 나머지 기간을 모두 포함
+    base = max(batches.values(), key=lambda batch: len(batch["dates"]))
+
+    dates = base["dates"]
+    index = {day: i for i, day in enumerate(dates)}
+    periods = {}
+    for period in PERIODS:
+        batch = batches[period]
+        if batch["dates"]:
+            start = index[batch["dates"][0]]
+            end = start + len(batch["dates"])
+            if dates[start:end] != batch["dates"]:
+                raise ValueError(f"{period} 구간이 기준 dates에 없습니다")
+        else:
+            start = end = len(dates)
+        periods[period] = {"start": start, "end": end, "stats": batch["stats"]}
+
+    snapshot = {
+        "version": 2,
+        "metrics": METRICS,
+        "dates": dates,
+        "values": {metric: base["values"][metric] for metric in METRICS},
+        "periods": periods,
+    }
+    if custom_days and dates:
+        snapshot["custom"] = {"startDate": dates[0], "endDate": dates[-1]}
+    return snapshot
+
+
+def build_v2_from_api(api_url, custom_days, concurrency=8):
+    if not wait_for_server(api_url):
+        print("서버에 연결할 수 없습니다")
+        sys.exit(1)
+
+    requests = preset_requests()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        responses = list(executor.map(lambda request: batch_from_api(api_url, *request[1:]), requests))
+    batches = {request[0]: response for request, response in zip(requests, responses)}
+    if custom_days:
+        key, *request = custom_request(custom_days, batches)
+        batches[key] = batch_from_api(api_url, *request)
+    for key, batch in batches.items():
+        print(f"  OK  {key}: {len(batch['dates'])}일")
+    return build_v2(batches, custom_days)
+
+
+def build_v2_from_db(custom_days):
+    series_cache = load_series_cache()
+    batches = {}
+    for key, period, start_date, end_date in preset_requests():
+        batches[key] = batch_from_db(series_cache, period, start_date, end_date)
+    if custom_days:
+        key, *request = custom_request(custom_days, batches)
+        batches[key] = batch_from_db(series_cache, *request)
+    for key, batch in batches.items():
+        print(f"  OK  {key}: {len(batch['dates'])}일")
+    return build_v2(batches, custom_days)
+
+
+def content_hash(snapshot):
+    """updatedAt을 제외한 내용의 hash (key 순서 무관)"""
+    content = {key: value for key, value in snapshot.items() if key != "updatedAt"}
+    canonical = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def read_existing(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_snapshot(snapshot, path):
+    """minified JSON과 미리 압축한 .gz / .br 파일 저장, 저장한 파일 목록 반환"""
+    body = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # mtime=0: 같은 내용이면 .gz도 바이트 단위로 같게
+    outputs = {path: body, path.with_name(path.name + ".gz"): gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        outputs[path.with_name(path.name + ".br")] = brotli.compress(body, quality=11)
+
+    for target, data in outputs.items():
+        target.write_bytes(data)
+        print(f"저장: {target} ({len(data):,} bytes)")
+    return list(outputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fallback-data.json 생성")
+    parser.add_argument("api_url", nargs="?", default=DEFAULT_API_URL)
+    parser.add_argument("--from-db", action="store_true", help="HTTP 대신 DB에서 직접 생성")
+    parser.add_argument("--output", type=Path, default=OUTPUT)
+    parser.add_argument("--format", choices=["v1", "v2"], default="v2")
+    parser.add_argument("--custom-days", type=int, default=0, help="v2: 사용자 지정 기간용으로 담을 최근 일수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--force", action="store_true", help="내용이 같아도 다시 저장")
+    args = parser.parse_args()
+
+    print(f"Source: {'database' if args.from_db else args.api_url}")
+    print(f"Output: {args.output} ({args.format})\n")
+
+    existing = read_existing(args.output)
+
+    if args.format == "v2":
+        # v2는 한 구간이라도 실패하면 조합할 수 없으므로 이전 파일 유지
+        try:
+            if args.from_db:
+                result = build_v2_from_db(args.custom_days)
+            else:
+                result = build_v2_from_api(args.api_url, args.custom_days, args.concurrency)
+        except Exception as e:
+            print(f"\n생성 실패, 이전 파일 유지: {e}")
+            sys.exit(1)
+        fail = 0
+    elif args.from_db:
+        result, fail = build_from_db()
+    else:
+        result, fail = build_from_api(args.api_url, args.concurrency)
+
+    if fail and existing is not None and existing.get("version") is None:
+        # 일부 실패 시 이전 데이터 유지
+        for metric in METRICS:
+            for period in PERIODS:
+                if not result[metric][period]["series"] and existing.get(metric, {}).get(period):
+                    result[metric][period] = existing[metric][period]
+
+    if not args.force and existing is not None and content_hash(existing) == content_hash(result):
+        print("\n변경 없음: 저장 생략")
+        return
+
+    result["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    write_snapshot(result, args.output)
 
-    print(f"\n완료: {success}건 성공, {fail}건 실패")
-    print(f"저장: {OUTPUT}")
+    if args.format == "v1":
+        total = len(METRICS) * len(PERIODS)
+        print(f"\n완료: {total - fail}건 성공, {fail}건 실패")
 
 
 if __name__ == "__main__":